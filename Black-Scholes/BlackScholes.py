@@ -1,6 +1,9 @@
+import argparse
+import csv
+import json
+
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import norm
+from scipy.special import erfc
 
 class BlackScholes:
     def __init__(self, S, K, T, r, sigma):
@@ -10,6 +13,19 @@ class BlackScholes:
         self.r = r  # risk‑free rate
         self.sigma = sigma  # volatility
 
+
+SQRT_2 = np.sqrt(2.0)
+INV_SQRT_2PI = 1 / np.sqrt(2 * np.pi)
+
+
+#standard normal cdf through erfc, skips the per call overhead of scipy.stats.norm
+def norm_cdf(x):
+    return 0.5 * erfc(-x / SQRT_2)
+
+
+def norm_pdf(x):
+    return INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
 def calc_d1(bs: BlackScholes):
     numerator = np.log(bs.S / bs.K) + (bs.r + 0.5 * bs.sigma ** 2) * bs.T
     denominator = bs.sigma * np.sqrt(bs.T)
@@ -22,8 +38,8 @@ def calc_d1_and_d2(black_scholes: BlackScholes):
 
 def price_call(black_scholes: BlackScholes):
     d1, d2 = calc_d1_and_d2(black_scholes)
-    N_d1 = norm.cdf(d1)
-    N_d2 = norm.cdf(d2)
+    N_d1 = norm_cdf(d1)
+    N_d2 = norm_cdf(d2)
 
     S = black_scholes.S
     K = black_scholes.K
@@ -34,8 +50,8 @@ def price_call(black_scholes: BlackScholes):
 
 def price_put(black_scholes: BlackScholes):
     d1, d2 = calc_d1_and_d2(black_scholes)
-    N_d1 = norm.cdf(-d1)
-    N_d2 = norm.cdf(-d2)
+    N_d1 = norm_cdf(-d1)
+    N_d2 = norm_cdf(-d2)
 
     S = black_scholes.S
     K = black_scholes.K
@@ -46,10 +62,10 @@ def price_put(black_scholes: BlackScholes):
 
 def calc_greeks(bs: BlackScholes):
     d1, d2 = calc_d1_and_d2(bs)
-    cdf_N_d1 = norm.cdf(d1)
-    pdf_N_d1 = norm.pdf(d1)
-    cdf_N_d2 = norm.cdf(d2)
-    negative_cdf_N_d2 = norm.cdf(-d2)
+    cdf_N_d1 = norm_cdf(d1)
+    pdf_N_d1 = norm_pdf(d1)
+    cdf_N_d2 = norm_cdf(d2)
+    negative_cdf_N_d2 = norm_cdf(-d2)
 
     S = bs.S
     K = bs.K
@@ -89,7 +105,67 @@ def calc_greeks(bs: BlackScholes):
         'rho_put': rho_put,
     }
 
+#column names a chain table (structured array / DataFrame) must provide
+CHAIN_FIELDS = ("S", "K", "T", "r", "sigma")
+
+
+#broadcast the chain inputs to one common shape
+def _broadcast_chain(S, K, T, r, sigma):
+    return np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (S, K, T, r, sigma)))
+
+
+#fused kernel: prices and greeks for a whole chain of contracts in one numpy pass
+def price_chain(S, K, T, r, sigma):
+    S, K, T, r, sigma = _broadcast_chain(S, K, T, r, sigma)
+
+    sqrt_T = np.sqrt(T)
+    sigma_sqrt_T = sigma * sqrt_T
+
+    #d1 and d2 are computed once for every leg
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+
+    #N(-x) comes straight from erfc so deep otm legs keep their precision
+    cdf_N_d1 = norm_cdf(d1)
+    cdf_N_d2 = norm_cdf(d2)
+    negative_cdf_N_d1 = norm_cdf(-d1)
+    negative_cdf_N_d2 = norm_cdf(-d2)
+    pdf_N_d1 = norm_pdf(d1)
+
+    discounted_K = K * np.exp(-r * T)
+    S_pdf_N_d1 = S * pdf_N_d1
+    time_decay = S_pdf_N_d1 * sigma / (2 * sqrt_T)
+    call_K_leg = discounted_K * cdf_N_d2
+    put_K_leg = discounted_K * negative_cdf_N_d2
+
+    return {
+        'call': S * cdf_N_d1 - call_K_leg,
+        'put': put_K_leg - S * negative_cdf_N_d1,
+        'delta_call': cdf_N_d1,
+        'delta_put': cdf_N_d1 - 1,
+        'gamma': pdf_N_d1 / (S * sigma_sqrt_T),
+        'vega': S_pdf_N_d1 * sqrt_T,
+        'theta_call': - time_decay - r * call_K_leg,
+        'theta_put': - time_decay + r * put_K_leg,
+        'rho_call': T * call_K_leg,
+        'rho_put': - T * put_K_leg,
+    }
+
+
+#both legs and every greek for one BlackScholes object from a single kernel call
+def price_and_greeks(bs: BlackScholes):
+    return price_chain(bs.S, bs.K, bs.T, bs.r, bs.sigma)
+
+
+#same as price_chain but reads S, K, T, r, sigma columns from a structured array or DataFrame
+def price_chain_table(table):
+    return price_chain(*(np.asarray(table[field], dtype=float) for field in CHAIN_FIELDS))
+
+
 def implied_volatility(bs: BlackScholes, market_price, sigma, is_call = True, precision = 1e-5, max_iteration = 100):
+    #work on a copy so the caller's object keeps its sigma
+    bs = BlackScholes(bs.S, bs.K, bs.T, bs.r, sigma)
+
     for i in range(max_iteration):
         bs.sigma = sigma
 
@@ -117,6 +193,153 @@ def implied_volatility(bs: BlackScholes, market_price, sigma, is_call = True, pr
     return sigma
 
 
+#relative rounding of a quote moved through put-call parity, time values below it carry no vol information
+PARITY_NOISE = 1e-12
+
+
+#out-of-the-money price (call above the forward, put below) and vega, the two things the iv solver needs
+#per step. ITM prices are intrinsic plus a time value that cancellation would wipe out, OTM prices keep it all
+def _otm_price_and_vega(S, K, T, r, sigma, otm_call):
+    sqrt_T = np.sqrt(T)
+    sigma_sqrt_T = sigma * sqrt_T
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+    discounted_K = K * np.exp(-r * T)
+    price = np.where(otm_call, S * norm_cdf(d1) - discounted_K * norm_cdf(d2),
+                     discounted_K * norm_cdf(-d2) - S * norm_cdf(-d1))
+    return price, S * sqrt_T * norm_pdf(d1)
+
+
+#implied vol for a whole chain: Newton-Raphson with a per-contract bisection fallback.
+#every quote is turned into the OTM option at its strike through put-call parity, and a contract
+#converges when the Newton step or its bracket is below precision (in vol), not on the price,
+#so deep ITM / OTM quotes with tiny prices are solved to the same accuracy as ATM ones.
+#NaN where the quote breaks the no-arbitrage bounds, the root lies outside [sigma_low, sigma_high],
+#or vega is negligible and the bracket has not collapsed within max_iteration
+def implied_volatility_chain(market_price, S, K, T, r, is_call = True, sigma = None,
+                             precision = 1e-8, max_iteration = 100, sigma_low = 1e-6, sigma_high = 10.0):
+    market_price, S, K, T, r, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (market_price, S, K, T, r, is_call)))
+    shape = market_price.shape
+    market_price, S, K, T, r = (x.ravel() for x in (market_price, S, K, T, r))
+    is_call = is_call.ravel().astype(bool)
+
+    discounted_K = K * np.exp(-r * T)
+    otm_call = S <= discounted_K
+    forward_value = S - discounted_K
+
+    #C - P = S - K e^-rT moves the quote onto the OTM side
+    direct = is_call == otm_call
+    target = market_price + np.where(direct, 0.0, np.where(is_call, -forward_value, forward_value))
+
+    #prices outside the no-arbitrage bounds have no implied vol, and neither do ITM quotes whose
+    #time value is lost in the rounding of the quote itself
+    valid = (target > 0) & (target < np.where(otm_call, S, discounted_K)) & (T > 0)
+    valid &= direct | (target > PARITY_NOISE * (market_price + S + discounted_K))
+
+    #every contract keeps its own bracket [low, high] around the root
+    low = np.full(target.shape, sigma_low)
+    high = np.full(target.shape, sigma_high)
+    if sigma is None:
+        #Brenner-Subrahmanyam guess for an at-the-money option
+        sigma = np.sqrt(2 * np.pi / np.where(T > 0, T, 1)) * target / S
+    else:
+        sigma = np.broadcast_to(np.asarray(sigma, dtype=float), shape).ravel()
+    sigma = np.clip(sigma, sigma_low, sigma_high)
+
+    iv = np.full(target.shape, np.nan)
+    active = np.flatnonzero(valid)
+
+    for i in range(max_iteration):
+        if active.size == 0:
+            break
+
+        s = sigma[active]
+        price, vega = _otm_price_and_vega(S[active], K[active], T[active], r[active], s, otm_call[active])
+        diff = price - target[active]
+
+        #price is increasing in sigma so the sign of diff tells which side the root is on
+        too_high = diff > 0
+        high[active] = np.where(too_high, s, high[active])
+        low[active] = np.where(too_high, low[active], s)
+
+        #Newton step, bisect where vega vanishes or the step leaves the bracket
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = s - diff / vega
+        bisect = (vega < 1e-12 * S[active]) | ~(step > low[active]) | ~(step < high[active])
+        new_sigma = np.where(bisect, 0.5 * (low[active] + high[active]), step)
+        sigma[active] = new_sigma
+
+        #chk for convergence, in vol: a small Newton step or a collapsed bracket
+        done = (diff == 0) | (~bisect & (np.abs(step - s) < precision)) | (high[active] - low[active] < precision)
+        iv[active[done]] = np.where(diff[done] == 0, s[done], new_sigma[done])
+
+        active = active[~done]
+
+    #a root pinned to the edge of the search range is not a root
+    at_edge = (iv - sigma_low < precision) | (sigma_high - iv < precision)
+    iv[at_edge] = np.nan
+    return iv.reshape(shape)
+
+
+#American option on a CRR binomial tree, backward induction runs across every contract at once
+#all contracts share the step count, is_call can be a per-contract array
+def price_american_chain(S, K, T, r, sigma, is_call = False, steps = 1000):
+    S, K, T, r, sigma, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (S, K, T, r, sigma, is_call)))
+    shape = S.shape
+    S, K, T, r, sigma, is_call = (x.ravel() for x in (S, K, T, r, sigma, is_call))
+    sign = np.where(is_call, 1.0, -1.0)
+
+    #at expiry or with no volatility the path is known, so the value is the better of exercising now
+    #and at expiry (the CRR probability is 0/0 there)
+    price = np.maximum(np.maximum(sign * (S - K), sign * (S - K * np.exp(-r * np.maximum(T, 0)))), 0)
+    live = (T > 0) & (sigma > 0)
+    if np.any(live):
+        price[live] = _crr_lattice(S[live], K[live], T[live], r[live], sigma[live], sign[live], steps)
+    return price.reshape(shape)
+
+
+#backward induction over contracts with T > 0 and sigma > 0, sign is +1 for calls and -1 for puts
+def _crr_lattice(S, K, T, r, sigma, sign, steps):
+    dt = T / steps
+    u = np.exp(sigma * np.sqrt(dt))
+    d = 1 / u
+    discount = np.exp(-r * dt)
+    p = (np.exp(r * dt) - d) / (u - d)
+
+    #per-contract constants as columns so they broadcast along the nodes
+    up_weight = (discount * p)[:, None]
+    down_weight = (discount * (1 - p))[:, None]
+    sign = sign[:, None]
+
+    #every node price is S * u^k for some k in [-steps, steps], so exercise values are computed once
+    #node j at step i is S * u^(i - 2j) = ladder[steps - i + 2j]
+    ladder = S[:, None] * np.exp(np.log(u)[:, None] * np.arange(steps, -steps - 1, -1))
+    exercise = np.maximum(sign * (ladder - K[:, None]), 0)
+
+    values = exercise[:, ::2].copy()
+    scratch = np.empty_like(values)
+
+    #buffers are reused in place, each level only touches its first i + 1 columns
+    for i in range(steps - 1, -1, -1):
+        v = values[:, :i + 1]
+        tmp = scratch[:, :i + 1]
+
+        np.multiply(values[:, 1:i + 2], down_weight, out=tmp)
+        np.multiply(v, up_weight, out=v)
+        np.add(v, tmp, out=v)
+
+        #early exercise
+        np.maximum(v, exercise[:, steps - i:steps + i + 1:2], out=v)
+
+    return values[:, 0]
+
+
+def price_american(bs: BlackScholes, is_call = False, steps = 1000):
+    return price_american_chain(bs.S, bs.K, bs.T, bs.r, bs.sigma, is_call, steps)
+
+
 def parse_numbers(raw: str) -> list[float]:
     cleaned = []
     for token in raw.replace(",", " ").split():
@@ -143,6 +366,196 @@ def get_historical_volatility(prices):
     return np.std(log_ret, ddof=1) * np.sqrt(365)
 
 
+#rolling mean of the last `window` values from one running sum, O(n) for any window
+def _rolling_mean(x, window):
+    running = np.concatenate(([0.0], np.cumsum(x)))
+    return (running[window:] - running[:-window]) / window
+
+
+#sample variance per window from running sums of x and x^2
+def _rolling_var(x, window):
+    #shift by the global mean so the running sums don't cancel catastrophically
+    x = x - np.mean(x)
+    mean = _rolling_mean(x, window)
+    mean_sq = _rolling_mean(x * x, window)
+    return np.maximum(mean_sq - mean * mean, 0) * window / (window - 1)
+
+
+#annualized vol of every `window` day stretch, element i covers returns i .. i + window - 1
+def rolling_volatility(prices, window = 30, periods_per_year = 365):
+    prices = np.asarray(prices, dtype=float)
+    log_ret = np.log(prices[1:] / prices[:-1])
+    return np.sqrt(_rolling_var(log_ret, window) * periods_per_year)
+
+
+#RiskMetrics style EWMA vol, var_t = lam * var_(t-1) + (1 - lam) * r_t^2
+def ewma_volatility(prices, lam = 0.94, periods_per_year = 365):
+    from scipy.signal import lfilter
+
+    prices = np.asarray(prices, dtype=float)
+    log_ret = np.log(prices[1:] / prices[:-1])
+    sq_ret = log_ret ** 2
+
+    #the recursion is a first order IIR filter, seeded with the first squared return
+    variance, _ = lfilter([1 - lam], [1, -lam], sq_ret, zi=[lam * sq_ret[0]])
+    return np.sqrt(variance * periods_per_year)
+
+
+def load_ohlc_from_csv(path: str):
+    columns = {"Open": [], "High": [], "Low": [], "Close": []}
+    with open(path, "r", newline="") as f:
+        for row in csv.DictReader(f):
+            for name, values in columns.items():
+                values.append(float(row[name]))
+    return {name: np.array(values) for name, values in columns.items()}
+
+
+#mean over the whole series when window is None, otherwise a rolling series
+def _window_mean(x, window):
+    return np.mean(x) if window is None else _rolling_mean(x, window)
+
+
+def _window_var(x, window):
+    return np.var(x, ddof=1) if window is None else _rolling_var(x, window)
+
+
+#Parkinson: high/low range only
+def parkinson_volatility(high, low, window = None, periods_per_year = 365):
+    hl = np.log(np.asarray(high, dtype=float) / np.asarray(low, dtype=float)) ** 2
+    return np.sqrt(_window_mean(hl, window) / (4 * np.log(2)) * periods_per_year)
+
+
+#Garman-Klass: range plus open-to-close move
+def garman_klass_volatility(open_, high, low, close, window = None, periods_per_year = 365):
+    open_, high, low, close = (np.asarray(x, dtype=float) for x in (open_, high, low, close))
+    hl = np.log(high / low) ** 2
+    co = np.log(close / open_) ** 2
+    daily_var = 0.5 * hl - (2 * np.log(2) - 1) * co
+    return np.sqrt(np.maximum(_window_mean(daily_var, window), 0) * periods_per_year)
+
+
+#Yang-Zhang: overnight + open-to-close + Rogers-Satchell, robust to drift and opening jumps
+def yang_zhang_volatility(open_, high, low, close, window = None, periods_per_year = 365):
+    open_, high, low, close = (np.asarray(x, dtype=float) for x in (open_, high, low, close))
+
+    #first bar has no previous close so every term starts at bar 1
+    overnight = np.log(open_[1:] / close[:-1])
+    open_close = np.log(close[1:] / open_[1:])
+    high, low, open_, close = high[1:], low[1:], open_[1:], close[1:]
+    rogers_satchell = np.log(high / close) * np.log(high / open_) + np.log(low / close) * np.log(low / open_)
+
+    n = overnight.size if window is None else window
+    k = 0.34 / (1.34 + (n + 1) / (n - 1))
+
+    variance = (_window_var(overnight, window) + k * _window_var(open_close, window)
+                + (1 - k) * _window_mean(rogers_satchell, window))
+    return np.sqrt(variance * periods_per_year)
+
+
+#matplotlib is only imported when a plot is actually requested
+def plot_scenario(bs: BlackScholes, spot_range, call_values, gamma_values):
+    import matplotlib.pyplot as plt
+
+    S = bs.S
+    K = bs.K
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
+
+    # Price Plot
+    ax1.plot(spot_range, call_values, label='Theoretical Call Price', color='blue', linewidth=2)
+    # Intrinsic Value (Payoff at expiry)
+    intrinsic = np.maximum(spot_range - K, 0)
+    ax1.plot(spot_range, intrinsic, label='Intrinsic Value (Expiry)', color='gray', linestyle='--')
+
+    ax1.axvline(S, color='orange', linestyle=':', label='Current Spot')
+    ax1.axvline(K, color='black', linewidth=1, label='Strike')
+    ax1.set_title(f"Option Price Scenario (Strike: ${K})")
+    ax1.set_ylabel("Price ($)")
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+
+    # Gamma Plot
+    ax2.plot(spot_range, gamma_values, color='red', label='Gamma (Convexity)')
+    ax2.fill_between(spot_range, gamma_values, color='red', alpha=0.1)
+    ax2.axvline(S, color='orange', linestyle=':', label='Current Spot')
+    ax2.axvline(K, color='black', linewidth=1, label='Strike')
+    ax2.set_title("The Death Zone: Gamma Risk Exposure")
+    ax2.set_xlabel("Spot Price ($)")
+    ax2.set_ylabel("Gamma Value")
+    ax2.legend()
+    ax2.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.show()
+
+
+# --- Headless batch mode ---
+
+#price a list of contracts described by a config dict (same keys as the JSON job file)
+#S and sigma come from the config or are calibrated from prices_file like the interactive mode
+def run_batch(config: dict) -> list[dict]:
+    S = config.get("S")
+    sigma = config.get("sigma")
+    if "prices_file" in config:
+        prices = load_numbers_from_file(config["prices_file"])
+        if not prices:
+            raise ValueError(f"No prices loaded from {config['prices_file']}")
+        S = prices[-1] if S is None else S
+        sigma = get_historical_volatility(prices) if sigma is None else sigma
+
+    contracts = config["contracts"]
+    S = np.array([c.get("S", S) for c in contracts], dtype=float)
+    sigma = np.array([c.get("sigma", sigma) for c in contracts], dtype=float)
+    K = np.array([c["K"] for c in contracts], dtype=float)
+    T = np.array([c["T"] if "T" in c else c["days"] / 365.0 for c in contracts], dtype=float)
+    r = np.array([c.get("r", config.get("r", 0.0)) for c in contracts], dtype=float)
+    is_call = np.array([c.get("is_call", True) for c in contracts], dtype=bool)
+    market_price = np.array([c.get("market_price", np.nan) for c in contracts], dtype=float)
+
+    results = price_chain(S, K, T, r, sigma)
+    results['iv'] = np.full(K.shape, np.nan)
+    quoted = ~np.isnan(market_price)
+    if quoted.any():
+        results['iv'][quoted] = implied_volatility_chain(
+            market_price[quoted], S[quoted], K[quoted], T[quoted], r[quoted], is_call[quoted])
+
+    if config.get("plot"):
+        for i in range(K.size):
+            bs = BlackScholes(S[i], K[i], T[i], r[i], sigma[i])
+            spot_range = np.linspace(S[i] * 0.8, S[i] * 1.2, 100)
+            scenario = price_chain(spot_range, K[i], T[i], r[i], sigma[i])
+            plot_scenario(bs, spot_range, scenario['call'], scenario['gamma'])
+
+    inputs = {"S": S, "K": K, "T": T, "r": r, "sigma": sigma, "is_call": is_call}
+    return [
+        {**{name: values[i].item() for name, values in inputs.items()},
+         **{name: values[i].item() for name, values in results.items()}}
+        for i in range(K.size)
+    ]
+
+
+#.csv gets one row per result, anything else is written as JSON, no path prints JSON
+def write_results(rows: list[dict], path: str | None = None):
+    if path is None:
+        print(json.dumps(rows, indent=2))
+    elif path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Black-Scholes option pricer & greeks")
+    parser.add_argument("--config", help="JSON job file, runs headless instead of the interactive prompt")
+    parser.add_argument("--out", help="write results to a .csv or .json file (default: print JSON)")
+    parser.add_argument("--plot", action="store_true", help="show the scenario plot for every contract")
+    return parser.parse_args(argv)
+
+
 # --- Main Execution Loop GENERATED WITH AI ---
 
 def main():
@@ -182,9 +595,9 @@ def main():
         # 3. Initialize Object & Run Pricing
         bs = BlackScholes(S, K, T, r, sigma_hist)
 
-        call_price = price_call(bs)
-        put_price = price_put(bs)
-        greeks = calc_greeks(bs)
+        greeks = price_and_greeks(bs)
+        call_price = greeks['call']
+        put_price = greeks['put']
 
         # 4. Output Results
         print(f"\n[Theoretical Fair Value]")
@@ -209,7 +622,7 @@ def main():
         if mkt_price_input.strip():
             try:
                 mkt_price = float(mkt_price_input)
-                # Pass a copy of the object or reset sigma after, here we pass current
+                # The solver works on its own copy, bs keeps the historical sigma
                 # Initial guess can be historical vol
                 iv = implied_volatility(bs, mkt_price, sigma=sigma_hist, is_call=True)
 
@@ -225,49 +638,20 @@ def main():
 
         # Create a range of spot prices +/- 20%
         spot_range = np.linspace(S * 0.8, S * 1.2, 100)
-        call_values = []
-        gamma_values = []
-
-        # Save original S to restore later
-        original_S = bs.S
-
-        for spot in spot_range:
-            bs.S = spot  # Update object
-            call_values.append(price_call(bs))
-            gamma_values.append(calc_greeks(bs)['gamma'])
-
-        bs.S = original_S  # Restore
-
-        # Plotting
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
-
-        # Price Plot
-        ax1.plot(spot_range, call_values, label='Theoretical Call Price', color='blue', linewidth=2)
-        # Intrinsic Value (Payoff at expiry)
-        intrinsic = np.maximum(spot_range - K, 0)
-        ax1.plot(spot_range, intrinsic, label='Intrinsic Value (Expiry)', color='gray', linestyle='--')
-
-        ax1.axvline(S, color='orange', linestyle=':', label='Current Spot')
-        ax1.axvline(K, color='black', linewidth=1, label='Strike')
-        ax1.set_title(f"Option Price Scenario (Strike: ${K})")
-        ax1.set_ylabel("Price ($)")
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-
-        # Gamma Plot
-        ax2.plot(spot_range, gamma_values, color='red', label='Gamma (Convexity)')
-        ax2.fill_between(spot_range, gamma_values, color='red', alpha=0.1)
-        ax2.axvline(S, color='orange', linestyle=':', label='Current Spot')
-        ax2.axvline(K, color='black', linewidth=1, label='Strike')
-        ax2.set_title("The Death Zone: Gamma Risk Exposure")
-        ax2.set_xlabel("Spot Price ($)")
-        ax2.set_ylabel("Gamma Value")
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-
-        plt.tight_layout()
-        plt.show()
+        # Price the whole sweep in one pass instead of mutating bs per spot
+        scenario = price_chain(spot_range, bs.K, bs.T, bs.r, bs.sigma)
+        call_values = scenario['call']
+        gamma_values = scenario['gamma']
+
+        plot_scenario(bs, spot_range, call_values, gamma_values)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.config:
+        with open(args.config, "r") as f:
+            job = json.load(f)
+        job["plot"] = job.get("plot", False) or args.plot
+        write_results(run_batch(job), args.out)
+    else:
+        main()
\ No newline at end of file
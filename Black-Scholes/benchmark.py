@@ -0,0 +1,196 @@
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from BlackScholes import (BlackScholes, price_call, price_put, calc_greeks, price_chain,
+                          implied_volatility, implied_volatility_chain,
+                          load_numbers_from_file, get_historical_volatility)
+
+DEFAULT_SIZES = (1, 1_000, 100_000, 10_000_000)
+
+#the scalar path is a python loop over BlackScholes objects, larger sizes are skipped
+SCALAR_MAX = 1_000
+
+#a case counts as a regression when throughput drops more than this vs the baseline
+DEFAULT_TOLERANCE = 0.2
+
+
+#synthetic chain around the last price in the data file, strikes +/-50%, expiries 1-365 days
+def synthetic_chain(prices_file, n, seed=0):
+    prices = load_numbers_from_file(prices_file)
+    if not prices:
+        raise ValueError(f"No prices loaded from {prices_file}")
+
+    rng = np.random.default_rng(seed)
+    S = np.full(n, prices[-1])
+    K = S * rng.uniform(0.5, 1.5, n)
+    T = rng.integers(1, 366, n) / 365
+    r = np.full(n, 0.045)
+    sigma = get_historical_volatility(prices) * rng.uniform(0.7, 1.3, n)
+    market_price = price_chain(S, K, T, r, sigma)['call']
+    return {"S": S, "K": K, "T": T, "r": r, "sigma": sigma, "market_price": market_price}
+
+
+def _scalar(fn):
+    def run(chain):
+        for i in range(chain["S"].size):
+            fn(BlackScholes(chain["S"][i], chain["K"][i], chain["T"][i], chain["r"][i], chain["sigma"][i]))
+    return run
+
+
+def _batch(fn):
+    def run(chain):
+        fn(BlackScholes(chain["S"], chain["K"], chain["T"], chain["r"], chain["sigma"]))
+    return run
+
+
+def _iv_scalar(chain):
+    for i in range(chain["S"].size):
+        bs = BlackScholes(chain["S"][i], chain["K"][i], chain["T"][i], chain["r"][i], chain["sigma"][i])
+        implied_volatility(bs, chain["market_price"][i], sigma=0.5)
+
+
+def _iv_batch(chain):
+    implied_volatility_chain(chain["market_price"], chain["S"], chain["K"], chain["T"], chain["r"])
+
+
+CASES = {
+    "price_call/scalar": _scalar(price_call),
+    "price_call/batch": _batch(price_call),
+    "price_put/scalar": _scalar(price_put),
+    "price_put/batch": _batch(price_put),
+    "calc_greeks/scalar": _scalar(calc_greeks),
+    "calc_greeks/batch": _batch(calc_greeks),
+    "implied_volatility/scalar": _iv_scalar,
+    "implied_volatility/batch": _iv_batch,
+}
+
+
+#each timed repeat runs the case back to back for at least this long, shorter windows are
+#dominated by timer and scheduler noise and would trip the regression check on identical code
+MIN_REPEAT_SECONDS = 0.2
+
+
+#times a case flagged as a regression is measured again before it is reported
+CONFIRM_RUNS = 2
+
+
+#how many back to back calls fill MIN_REPEAT_SECONDS, doubling like timeit's autorange (also warms up)
+def _calls_per_repeat(run, chain):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run(chain)
+        if time.perf_counter() - start >= MIN_REPEAT_SECONDS:
+            return number
+        number *= 2
+
+
+#best wall time over `repeat` runs, then one extra run under tracemalloc for peak memory
+#(tracemalloc slows python code down, so it never overlaps with the timed runs)
+def measure(run, chain, repeat=3):
+    n = chain["S"].size
+    number = _calls_per_repeat(run, chain)
+
+    #garbage collection is paused while timing like timeit does, the scalar cases leave a lot behind
+    best = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                run(chain)
+            best = min(best, (time.perf_counter() - start) / number)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    run(chain)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"n": n, "seconds": best, "contracts_per_sec": n / best, "peak_mb": peak / 1e6}
+
+
+def run_benchmarks(prices_file="btc.csv", sizes=DEFAULT_SIZES, cases=None, repeat=3, seed=0, scalar_max=SCALAR_MAX):
+    results = {}
+    for n in sizes:
+        chain = synthetic_chain(prices_file, n, seed)
+        for name, run in CASES.items():
+            if cases and name not in cases:
+                continue
+            if name.endswith("/scalar") and n > scalar_max:
+                continue
+            key = f"{name}/{n}"
+            results[key] = measure(run, chain, repeat)
+            print(f"{key:<36} {results[key]['contracts_per_sec']:>16,.0f} contracts/s "
+                  f"{results[key]['peak_mb']:>10.1f} MB peak", file=sys.stderr)
+    return results
+
+
+#cases present in both runs whose throughput fell by more than tolerance
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    regressions = {}
+    for key, current in results.items():
+        if key not in baseline:
+            continue
+        ratio = current["contracts_per_sec"] / baseline[key]["contracts_per_sec"]
+        if ratio < 1 - tolerance:
+            regressions[key] = ratio
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput benchmark for the Black-Scholes module")
+    parser.add_argument("--file", default="btc.csv", help="price file the synthetic chains are seeded from")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), help="only run these cases")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scalar-max", type=int, default=SCALAR_MAX, help="largest size for the scalar loop")
+    parser.add_argument("--save", help="write the results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="JSON results to compare against, exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmarks(args.file, args.sizes, args.cases, args.repeat, args.seed, args.scalar_max)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+
+        #a slow window on a shared machine can still fail a case once, flagged cases are measured again
+        #and keep their best run, only a slowdown that persists is reported
+        for _ in range(CONFIRM_RUNS):
+            if not regressions:
+                break
+            for key in regressions:
+                name, n = key.rsplit("/", 1)
+                rerun = measure(CASES[name], synthetic_chain(args.file, int(n), args.seed), args.repeat)
+                if rerun["contracts_per_sec"] > results[key]["contracts_per_sec"]:
+                    results[key] = rerun
+            regressions = compare_to_baseline(results, baseline, args.tolerance)
+
+        for key, ratio in regressions.items():
+            print(f"REGRESSION {key}: {ratio:.0%} of baseline throughput", file=sys.stderr)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import numpy as np
+from BlackScholes import norm_cdf, norm_pdf
+
+BOOK_FIELDS = ("value", "delta", "gamma", "vega", "theta", "rho")
+
+
+#positions on one underlying with everything that doesn't depend on spot precomputed
+#puts are carried as calls plus a put-call parity adjustment, so a tick only needs N(d1), N(d2) and pdf(d1)
+class PositionGroup:
+    def __init__(self, K, T, r, sigma, quantity, is_call):
+        K, T, r, sigma, quantity, is_call = (np.ravel(x) for x in np.broadcast_arrays(
+            *(np.asarray(x, dtype=float) for x in (K, T, r, sigma, quantity, is_call))))
+        is_put = ~is_call.astype(bool)
+
+        sqrt_T = np.sqrt(T)
+        discounted_K = K * np.exp(-r * T)
+
+        self.size = K.size
+        self.log_K = np.log(K)
+        self.sigma_sqrt_T = sigma * sqrt_T
+        self.drift = (r + 0.5 * sigma ** 2) * T
+
+        #quantity folded into every per-position weight
+        self.q = quantity
+        self.q_discounted_K = quantity * discounted_K
+        self.q_over_sigma_sqrt_T = quantity / self.sigma_sqrt_T
+        self.q_sqrt_T = quantity * sqrt_T
+        self.q_theta_decay = quantity * sigma / (2 * sqrt_T)
+        self.q_r_discounted_K = self.q_discounted_K * r
+        self.q_T_discounted_K = self.q_discounted_K * T
+
+        #spot-independent parity terms summed over the puts
+        self.put_q = np.sum(quantity[is_put])
+        self.put_discounted_K = np.sum(self.q_discounted_K[is_put])
+        self.put_r_discounted_K = np.sum(self.q_r_discounted_K[is_put])
+        self.put_T_discounted_K = np.sum(self.q_T_discounted_K[is_put])
+
+    def reprice(self, S):
+        d1 = (np.log(S) - self.log_K + self.drift) / self.sigma_sqrt_T
+        d2 = d1 - self.sigma_sqrt_T
+        cdf_N_d1 = norm_cdf(d1)
+        cdf_N_d2 = norm_cdf(d2)
+        pdf_N_d1 = norm_pdf(d1)
+
+        K_leg = np.dot(self.q_discounted_K, cdf_N_d2)
+
+        return {
+            'value': S * np.dot(self.q, cdf_N_d1) - K_leg + self.put_discounted_K - S * self.put_q,
+            'delta': np.dot(self.q, cdf_N_d1) - self.put_q,
+            'gamma': np.dot(self.q_over_sigma_sqrt_T, pdf_N_d1) / S,
+            'vega': S * np.dot(self.q_sqrt_T, pdf_N_d1),
+            'theta': - S * np.dot(self.q_theta_decay, pdf_N_d1) - np.dot(self.q_r_discounted_K, cdf_N_d2)
+                     + self.put_r_discounted_K,
+            'rho': np.dot(self.q_T_discounted_K, cdf_N_d2) - self.put_T_discounted_K,
+        }
+
+
+#book of options on several underlyings, a spot tick only reprices that underlying's group
+class OptionPortfolio:
+    def __init__(self):
+        self.positions = {}
+        self.groups = {}
+        self.spots = {}
+        self.group_greeks = {}
+        self._dirty = set()
+
+    #positions are buffered and the group is rebuilt on its next tick
+    def add_positions(self, underlying, K, T, r, sigma, quantity = 1, is_call = True):
+        chunk = [np.ravel(x) for x in np.broadcast_arrays(*(np.asarray(x, dtype=float)
+                                                           for x in (K, T, r, sigma, quantity, is_call)))]
+        self.positions.setdefault(underlying, []).append(chunk)
+        self._dirty.add(underlying)
+
+        #keep the book totals current if this underlying already has a spot
+        if underlying in self.spots:
+            self.on_tick(underlying, self.spots[underlying])
+
+    def _build(self, underlying):
+        columns = [np.concatenate([chunk[field] for chunk in self.positions[underlying]]) for field in range(6)]
+        self.groups[underlying] = PositionGroup(*columns)
+        self._dirty.discard(underlying)
+
+    def on_tick(self, underlying, S):
+        if underlying in self._dirty:
+            self._build(underlying)
+
+        self.spots[underlying] = S
+        self.group_greeks[underlying] = self.groups[underlying].reprice(S)
+        return self.greeks()
+
+    #book totals, summed over the few underlyings rather than the positions
+    def greeks(self):
+        return {field: sum(g[field] for g in self.group_greeks.values()) for field in BOOK_FIELDS}
@@ -0,0 +1,129 @@
+import concurrent.futures
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from BlackScholes import price_chain
+import schemas
+
+#outputs in the order they are stored in the cache
+RESULT_FIELDS = ("call", "put", "delta_call", "delta_put", "gamma", "vega",
+                 "theta_call", "theta_put", "rho_call", "rho_put")
+
+#decimals kept per input in the cache key, quotes that agree to this precision share a cache entry
+QUANTIZE_DECIMALS = {"S": 2, "K": 2, "T": 6, "r": 6, "sigma": 6}
+
+CACHE_SIZE = 200_000
+
+#batches larger than this skip the cache, the per-contract lookups would cost more than the vectorized kernel
+CACHE_MAX_BATCH = 1_000
+
+#batches smaller than this are priced on the request thread
+MIN_CHUNK = 10_000
+
+app = FastAPI()
+
+# Allows all origins for the backend to connect with our frontend
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+#numpy releases the GIL inside the kernel, so threads price chunks in parallel
+WORKERS = os.cpu_count() or 1
+executor = concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "uncached": 0}
+
+
+def _price_block(block):
+    results = price_chain(*block)
+    return np.column_stack([results[field] for field in RESULT_FIELDS])
+
+
+#split the chain across the worker pool and stitch the rows back in order
+def _price_parallel(S, K, T, r, sigma):
+    n_chunks = max(1, min(WORKERS, S.size // MIN_CHUNK))
+    if n_chunks == 1:
+        return _price_block((S, K, T, r, sigma))
+
+    blocks = zip(*(np.array_split(x, n_chunks) for x in (S, K, T, r, sigma)))
+    return np.vstack(list(executor.map(_price_block, blocks)))
+
+
+def price_with_cache(S, K, T, r, sigma):
+    S, K, T, r, sigma = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (S, K, T, r, sigma)))
+    if np.any(S <= 0) or np.any(K <= 0) or np.any(T <= 0) or np.any(sigma <= 0):
+        raise ValueError("S, K, T and sigma must be positive")
+
+    S, K, T, r, sigma = (np.ravel(x) for x in (S, K, T, r, sigma))
+    if S.size > CACHE_MAX_BATCH:
+        with _cache_lock:
+            _cache_stats["uncached"] += S.size
+        return _price_parallel(S, K, T, r, sigma), 0
+
+    #only the cache key is quantized, misses are priced at the exact request values
+    keys = list(zip(*(np.round(x, QUANTIZE_DECIMALS[name]).tolist()
+                      for name, x in zip(("S", "K", "T", "r", "sigma"), (S, K, T, r, sigma)))))
+
+    rows = np.empty((len(keys), len(RESULT_FIELDS)))
+    misses = []
+    with _cache_lock:
+        for i, key in enumerate(keys):
+            cached = _cache.get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                _cache.move_to_end(key)
+                rows[i] = cached
+
+    if misses:
+        misses = np.array(misses)
+        rows[misses] = _price_parallel(S[misses], K[misses], T[misses], r[misses], sigma[misses])
+
+        with _cache_lock:
+            for i in misses.tolist():
+                _cache[keys[i]] = rows[i].copy()
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    hits = len(keys) - len(misses)
+    with _cache_lock:
+        _cache_stats["hits"] += hits
+        _cache_stats["misses"] += len(misses)
+
+    return rows, hits
+
+
+@app.post("/price", response_model=schemas.PriceResponse)
+def price_contract(contract: schemas.ContractBase):
+    try:
+        rows, _ = price_with_cache(contract.S, contract.K, contract.T, contract.r, contract.sigma)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return dict(zip(RESULT_FIELDS, rows[0].tolist()))
+
+
+@app.post("/price/batch", response_model=schemas.ChainResponse)
+def price_batch(chain: schemas.ChainRequest):
+    try:
+        rows, hits = price_with_cache(chain.S, chain.K, chain.T, chain.r, chain.sigma)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = {field: rows[:, i].tolist() for i, field in enumerate(RESULT_FIELDS)}
+    response["cache_hits"] = hits
+    return response
+
+
+@app.get("/cache")
+def cache_stats():
+    with _cache_lock:
+        return {"size": len(_cache), "max_size": CACHE_SIZE, **_cache_stats}
@@ -0,0 +1,76 @@
+import numpy as np
+from BlackScholes import price_chain
+
+#book level outputs per grid node
+GRID_FIELDS = ("value", "pnl", "delta", "gamma", "vega", "theta", "rho")
+
+#floors so expired or zero-vol scenarios don't divide by zero (prices go to intrinsic)
+MIN_T = 1e-8
+MIN_SIGMA = 1e-6
+
+
+#spot shocks x vol shocks x days forward for a whole book in one broadcast pass
+#spot_shocks are relative (-0.2 = spot down 20%), vol_shocks are absolute (0.05 = +5 vol points)
+def scenario_grid(S, K, T, r, sigma, quantity, is_call, spot_shocks, vol_shocks, days_forward,
+                  max_elements=2_000_000):
+    S, K, T, r, sigma, quantity, is_call = (np.ravel(x) for x in np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (S, K, T, r, sigma, quantity, is_call))))
+    is_call = is_call.astype(bool)
+
+    spot_shocks = np.ravel(np.asarray(spot_shocks, dtype=float))
+    vol_shocks = np.ravel(np.asarray(vol_shocks, dtype=float))
+    days_forward = np.ravel(np.asarray(days_forward, dtype=float))
+    grid_shape = (spot_shocks.size, vol_shocks.size, days_forward.size)
+
+    #flatten the grid so every chunk is one 2-D (positions x nodes) block
+    spot_factor, vol_shift, time_shift = (x.ravel() for x in np.meshgrid(
+        1 + spot_shocks, vol_shocks, days_forward / 365, indexing='ij'))
+    n_nodes = spot_factor.size
+
+    #today's book value is the P&L reference
+    today = price_chain(S, K, T, r, sigma)
+    base_value = np.sum(quantity * np.where(is_call, today['call'], today['put']))
+
+    totals = {field: np.zeros(n_nodes) for field in GRID_FIELDS}
+
+    #chunk positions and nodes so no block holds more than max_elements contracts
+    node_chunk = min(n_nodes, max_elements)
+    position_chunk = max(1, max_elements // node_chunk)
+
+    for p in range(0, S.size, position_chunk):
+        pos = slice(p, p + position_chunk)
+        qty = quantity[pos, None]
+        call = is_call[pos, None]
+
+        for g in range(0, n_nodes, node_chunk):
+            nodes = slice(g, g + node_chunk)
+            res = price_chain(
+                S[pos, None] * spot_factor[nodes],
+                K[pos, None],
+                np.maximum(T[pos, None] - time_shift[nodes], MIN_T),
+                r[pos, None],
+                np.maximum(sigma[pos, None] + vol_shift[nodes], MIN_SIGMA),
+            )
+
+            totals['value'][nodes] += np.sum(qty * np.where(call, res['call'], res['put']), axis=0)
+            totals['delta'][nodes] += np.sum(qty * np.where(call, res['delta_call'], res['delta_put']), axis=0)
+            totals['gamma'][nodes] += np.sum(qty * res['gamma'], axis=0)
+            totals['vega'][nodes] += np.sum(qty * res['vega'], axis=0)
+            totals['theta'][nodes] += np.sum(qty * np.where(call, res['theta_call'], res['theta_put']), axis=0)
+            totals['rho'][nodes] += np.sum(qty * np.where(call, res['rho_call'], res['rho_put']), axis=0)
+
+    totals['pnl'] = totals['value'] - base_value
+
+    grid = {field: totals[field].reshape(grid_shape) for field in GRID_FIELDS}
+    grid['spot_shocks'] = spot_shocks
+    grid['vol_shocks'] = vol_shocks
+    grid['days_forward'] = days_forward
+    return grid
+
+
+#long format csv, one row per grid node
+def grid_to_csv(grid, path):
+    spot, vol, days = np.meshgrid(grid['spot_shocks'], grid['vol_shocks'], grid['days_forward'], indexing='ij')
+    columns = [spot.ravel(), vol.ravel(), days.ravel()] + [grid[field].ravel() for field in GRID_FIELDS]
+    header = ",".join(("spot_shock", "vol_shock", "days_forward") + GRID_FIELDS)
+    np.savetxt(path, np.column_stack(columns), delimiter=",", header=header, comments="")
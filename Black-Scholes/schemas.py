@@ -0,0 +1,45 @@
+from pydantic import BaseModel
+
+
+class ContractBase(BaseModel):
+    S: float
+    K: float
+    T: float
+    r: float
+    sigma: float
+
+
+#columnar batch, a scalar field is broadcast against the lists
+class ChainRequest(BaseModel):
+    S: list[float] | float
+    K: list[float] | float
+    T: list[float] | float
+    r: list[float] | float
+    sigma: list[float] | float
+
+
+class PriceResponse(BaseModel):
+    call: float
+    put: float
+    delta_call: float
+    delta_put: float
+    gamma: float
+    vega: float
+    theta_call: float
+    theta_put: float
+    rho_call: float
+    rho_put: float
+
+
+class ChainResponse(BaseModel):
+    call: list[float]
+    put: list[float]
+    delta_call: list[float]
+    delta_put: list[float]
+    gamma: list[float]
+    vega: list[float]
+    theta_call: list[float]
+    theta_put: list[float]
+    rho_call: list[float]
+    rho_put: list[float]
+    cache_hits: int
@@ -0,0 +1,56 @@
+import numpy as np
+from BlackScholes import implied_volatility_chain, price_american_chain, price_chain
+
+
+def test_american_chain_at_expiry_is_intrinsic():
+    S = np.array([90.0, 100.0, 110.0])
+    calls = price_american_chain(S, 100, 0, 0.05, 0.2, is_call=True, steps=100)
+    puts = price_american_chain(S, 100, 0, 0.05, 0.2, is_call=False, steps=100)
+    np.testing.assert_array_equal(calls, [0.0, 0.0, 10.0])
+    np.testing.assert_array_equal(puts, [10.0, 0.0, 0.0])
+
+
+def test_american_chain_without_volatility_is_finite():
+    price = price_american_chain(100, [90, 110], 0.5, 0.05, 0, is_call=[True, False], steps=100)
+    assert np.all(np.isfinite(price))
+    #call: worth S - K e^-rT, put: exercised at once
+    np.testing.assert_allclose(price, [100 - 90 * np.exp(-0.025), 10.0])
+
+
+def test_american_chain_mixes_degenerate_and_live_rows():
+    price = price_american_chain(100, 100, [0, 0.5], 0.05, 0.2, steps=500)
+    assert price[0] == 0.0
+    assert 4 < price[1] < 6
+
+
+def test_implied_volatility_chain_round_trips_deep_itm_and_otm():
+    K = np.linspace(0.5, 2.0, 200)
+    prices = price_chain(1.0, K, 0.05, 0.0, 0.4)
+    for field, is_call in (("call", True), ("put", False)):
+        iv = implied_volatility_chain(prices[field], 1.0, K, 0.05, 0.0, is_call)
+        solved = np.isfinite(iv)
+        np.testing.assert_allclose(iv[solved], 0.4, atol=1e-6)
+
+        #every OTM quote solves, down to prices far below 1e-5
+        otm = K >= 1 if is_call else K <= 1
+        assert np.all(solved[otm])
+
+        #deep ITM quotes may only be NaN where the time value is lost in the rounding of the quote
+        intrinsic = np.maximum(1.0 - K, 0) if is_call else np.maximum(K - 1.0, 0)
+        quote = prices[field][~solved]
+        assert np.all(quote - intrinsic[~solved] < 1e-12 * (quote + 1.0 + K[~solved]))
+
+
+def test_implied_volatility_chain_random_chain_is_accurate_or_nan():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    S, K = rng.uniform(50, 150, n), rng.uniform(50, 150, n)
+    T, r = rng.uniform(0.02, 2, n), rng.uniform(0, 0.08, n)
+    sigma = rng.uniform(0.05, 1.5, n)
+    is_call = rng.random(n) < 0.5
+    prices = price_chain(S, K, T, r, sigma)
+
+    iv = implied_volatility_chain(np.where(is_call, prices["call"], prices["put"]), S, K, T, r, is_call)
+    solved = np.isfinite(iv)
+    assert solved.mean() > 0.97
+    np.testing.assert_allclose(iv[solved], sigma[solved], atol=1e-6)
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+
+import numpy as np
+from BlackScholes import price_chain, implied_volatility_chain
+
+#how many snapshots get_surface keeps around
+MAX_CACHED_SURFACES = 16
+
+_surface_cache = OrderedDict()
+
+
+#implied vol surface on a (expiry x forward log-moneyness) grid of total variance
+#bilinear coefficients are precomputed per cell so a lookup is searchsorted + one polynomial
+class VolSurface:
+    def __init__(self, log_moneyness, expiries, total_variance):
+        self.log_moneyness = np.asarray(log_moneyness, dtype=float)
+        self.expiries = np.asarray(expiries, dtype=float)
+        self.total_variance = np.asarray(total_variance, dtype=float)
+
+        if self.log_moneyness.size < 2 or self.expiries.size < 2:
+            raise ValueError("Surface needs at least two expiries and two moneyness points")
+
+        w = self.total_variance
+        dk = np.diff(self.log_moneyness)[None, :]
+        dT = np.diff(self.expiries)[:, None]
+
+        #w = a + b*dk + c*dT + d*dk*dT inside each cell
+        self._a = w[:-1, :-1]
+        self._b = (w[:-1, 1:] - w[:-1, :-1]) / dk
+        self._c = (w[1:, :-1] - w[:-1, :-1]) / dT
+        self._d = (w[1:, 1:] - w[1:, :-1] - w[:-1, 1:] + w[:-1, :-1]) / (dk * dT)
+
+    def vol(self, S, K, T, r=0.0):
+        S, K, T, r = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (S, K, T, r)))
+        k = np.log(K / S) - r * T
+
+        #flat in moneyness outside the quoted strikes, flat vol outside the quoted expiries
+        k_c = np.clip(k, self.log_moneyness[0], self.log_moneyness[-1])
+        T_c = np.clip(T, self.expiries[0], self.expiries[-1])
+
+        i = np.clip(np.searchsorted(self.expiries, T_c, side='right') - 1, 0, self.expiries.size - 2)
+        j = np.clip(np.searchsorted(self.log_moneyness, k_c, side='right') - 1, 0, self.log_moneyness.size - 2)
+        dk = k_c - self.log_moneyness[j]
+        dT = T_c - self.expiries[i]
+
+        w = self._a[i, j] + self._b[i, j] * dk + self._c[i, j] * dT + self._d[i, j] * dk * dT
+        return np.sqrt(np.maximum(w, 0) / T_c)
+
+    #reprice off-grid contracts with vols read from the surface
+    def price(self, S, K, T, r=0.0):
+        return price_chain(S, K, T, r, self.vol(S, K, T, r))
+
+
+#fit a surface to a chain of implied vols, each expiry slice is resampled on a shared moneyness grid
+def build_surface(S, K, T, iv, r=0.0, n_moneyness=50):
+    S, K, T, iv, r = (np.ravel(x) for x in np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (S, K, T, iv, r))))
+
+    keep = np.isfinite(iv) & (T > 0)
+    S, K, T, iv, r = S[keep], K[keep], T[keep], iv[keep], r[keep]
+    k = np.log(K / S) - r * T
+
+    expiries = np.unique(T)
+    log_moneyness = np.linspace(k.min(), k.max(), n_moneyness)
+    total_variance = np.empty((expiries.size, n_moneyness))
+
+    for row, expiry in enumerate(expiries):
+        in_slice = T == expiry
+        order = np.argsort(k[in_slice])
+        total_variance[row] = np.interp(log_moneyness, k[in_slice][order], (iv[in_slice] ** 2 * expiry)[order])
+
+    return VolSurface(log_moneyness, expiries, total_variance)
+
+
+#surface for one market snapshot, built once and then served from cache
+#pass either iv or market_price (then is_call says which leg the quotes are)
+def get_surface(snapshot_ts, S, K, T, r=0.0, iv=None, market_price=None, is_call=True, n_moneyness=50):
+    if snapshot_ts in _surface_cache:
+        _surface_cache.move_to_end(snapshot_ts)
+        return _surface_cache[snapshot_ts]
+
+    if iv is None:
+        if market_price is None:
+            raise ValueError("Provide iv or market_price to build a new surface")
+        iv = implied_volatility_chain(market_price, S, K, T, r, is_call)
+
+    surface = build_surface(S, K, T, iv, r, n_moneyness)
+
+    _surface_cache[snapshot_ts] = surface
+    if len(_surface_cache) > MAX_CACHED_SURFACES:
+        _surface_cache.popitem(last=False)
+
+    return surface
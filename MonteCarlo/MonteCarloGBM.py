@@ -1,5 +1,13 @@
+import argparse
+import contextlib
+import csv
+import json
+import sys
+
 import numpy as np
-import matplotlib.pyplot as plt
+from qmc import rqmc_paths_per_replicate, rqmc_replicates, sobol_normals
+from quantile_sketch import TerminalStats, sketch_seed
+from variance_reduction import draw_normals, summarize_terminal
 
 
 #calc volatility and corrected drift
@@ -22,10 +30,68 @@ def wiener_process_daily(current_price, days, mu, sigma):
     return prices
 
 #this is my attempt of vectorization on the GME model
-def vectorize_simulation(s0,days, reps, mu,sigma):
-    z = np.random.normal(0, 1, (reps, days))
-    daily_returns = np.exp(mu + sigma * z)
-    return s0 * np.cumprod(daily_returns, axis=1)
+#rng can be a np.random.Generator, by default the global np.random state is used
+#antithetic=True puts (z, -z) pairs in neighbouring rows, an odd reps gets one extra path
+#sampler="sobol" swaps the pseudo-random draws for scrambled Sobol points on a Brownian bridge
+#dtype=np.float32 halves the memory and bandwidth of the path matrix
+def vectorize_simulation(s0,days, reps, mu,sigma, rng=None, antithetic=False, sampler="pseudo", dtype=np.float64):
+    rng = np.random if rng is None else rng
+    if sampler == "sobol":
+        if antithetic:
+            raise ValueError("antithetic pairs are not combined with the Sobol sampler")
+        z = sobol_normals(reps, days, rng)[0].astype(dtype, copy=False)
+    else:
+        if antithetic:
+            reps += reps % 2
+        z = draw_normals(rng, (reps, days), antithetic, axis=0, dtype=dtype)
+
+    #one buffer: the normals become log returns, daily returns and then prices in place
+    z *= sigma
+    z += mu
+    np.exp(z, out=z)
+    np.cumprod(z, axis=1, out=z)
+    z *= s0
+    return z
+
+#exact terminal draw: the sum of `days` iid N(mu, sigma^2) daily log returns is N(days * mu, days * sigma^2)
+#one normal per path instead of `days`, for when nothing path dependent is needed
+def simulate_terminal(s0, days, reps, mu, sigma, rng=None, antithetic=False, sampler="pseudo", dtype=np.float64):
+    rng = np.random if rng is None else rng
+    if sampler == "sobol":
+        if antithetic:
+            raise ValueError("antithetic pairs are not combined with the Sobol sampler")
+        z = sobol_normals(reps, 1, rng, bridge=False)[0, :, 0].astype(dtype)
+    else:
+        if antithetic:
+            reps += reps % 2
+        z = draw_normals(rng, (reps,), antithetic, dtype=dtype)
+
+    #in place, like vectorize_simulation
+    z *= sigma * np.sqrt(days)
+    z += days * mu
+    np.exp(z, out=z)
+    z *= s0
+    return z
+
+
+#ending prices only, picks the one-shot terminal draw unless full paths are needed
+def simulate_ending_prices(s0, days, reps, mu, sigma, rng=None, antithetic=False, sampler="pseudo",
+                           paths_needed=False, dtype=np.float64):
+    if paths_needed:
+        return vectorize_simulation(s0, days, reps, mu, sigma, rng, antithetic, sampler, dtype)[:, -1]
+    return simulate_terminal(s0, days, reps, mu, sigma, rng, antithetic, sampler, dtype)
+
+
+#terminal stats in bounded memory: chunks of ending prices feed a running sum and a quantile sketch
+def simulate_terminal_stats(s0, days, reps, mu, sigma, chunk_size=1_000_000, rng=None, antithetic=False, k=2048,
+                            dtype=np.float64):
+    rng = np.random if rng is None else rng
+    stats = TerminalStats(s0, k, sketch_seed(rng), antithetic)
+    for start in range(0, reps, chunk_size):
+        stats.update(simulate_terminal(s0, days, min(chunk_size, reps - start), mu, sigma, rng, antithetic,
+                                       dtype=dtype))
+    return stats
+
 
 def parse_numbers(raw: str) -> list[int]:
     cleaned = []
@@ -50,6 +116,229 @@ def load_numbers_from_file(path: str) -> list[int]:
         return []
 
 
+#analytic E[S_T] after `days` daily steps of exp(mu + sigma * z), used as a control variate
+def gbm_expected_price(s0, days, mu, sigma):
+    return s0 * np.exp(days * (mu + 0.5 * sigma ** 2))
+
+
+#probability of profit and 5% VaR from the simulated ending prices, each with its standard error
+def summarize_ending_prices(ending_prices, s0, expected_price=None, antithetic=False):
+    return summarize_terminal(ending_prices, s0, expected_price, antithetic)
+
+
+#matplotlib is only imported when a plot is actually requested
+def plot_simulations(raw, simulations, days):
+    import matplotlib.pyplot as plt
+
+    mean_simulations = simulations.mean(axis=0)
+
+    #how much history to show
+    hist_window = min(len(raw), days)
+    hist_slice = raw[-hist_window:]
+
+    #x ranges
+    hist_x = range(hist_window)  # 0 ... hist_window-1
+    future_x = range(hist_window - 1, hist_window - 1 + days)
+
+    plt.figure(figsize=(12, 6))
+
+    #historical slice
+    plt.plot(hist_x, hist_slice, label="Historical Price", color="orange")
+
+    #vertical seperator
+    plt.axvline(
+        x=hist_window - 1,
+        color="black",
+        linestyle="--",
+        linewidth=2,
+        label="Forecast Start"
+    )
+    #first 10 simulated path
+    for path in simulations[:10]:
+        plt.plot(future_x, path, color="grey", linestyle="dashed", alpha=0.4)
+
+    #mean path
+    plt.plot(future_x, mean_simulations, label="Predicted Mean", color="green", linewidth=2)
+
+    plt.title("Historical + Future Prediction")
+    plt.legend()
+
+    plt.show()
+
+    #histogram of ending prices
+    plt.figure(figsize=(12, 6))
+    ending_prices = simulations[:, -1]
+
+    plt.hist(ending_prices, bins=50, color="green", edgecolor="black")
+
+    #5th percentile
+    plt.axvline(np.percentile(ending_prices, 5), color='r', linestyle='dashed', label="5% VaR")
+    plt.title("Distribution of Ending Prices")
+    plt.legend()
+
+    plt.show()
+
+
+#headless run: config has prices_file, days, reps and optionally seed and plot
+def run_batch(config: dict) -> dict:
+    raw = load_numbers_from_file(config["prices_file"])
+    if not raw:
+        raise ValueError(f"No prices loaded from {config['prices_file']}")
+
+    if config.get("seed") is not None:
+        np.random.seed(config["seed"])
+
+    sigma, mu = calc_sigma_and_mu_daily(raw)
+    days = int(config["days"]) + 1
+
+    if str(config["reps"]).lower() == "auto":
+        #adaptive: batches of paths until the VaR and probability of profit intervals meet the tolerances
+        from adaptive import adaptive_options, gbm_adaptive
+        stats = gbm_adaptive(raw[-1], days, mu, sigma, **adaptive_options(config))
+        return {"model": "gbm", "s0": float(raw[-1]), "days": days - 1, "reps": "auto",
+                "mu_daily": float(mu), "sigma_daily": float(sigma), **stats}
+    reps = int(config["reps"])
+
+    antithetic = bool(config.get("antithetic"))
+    dtype = np.dtype(config.get("dtype", "float64"))
+    expected_price = gbm_expected_price(raw[-1], days, mu, sigma) if config.get("control_variate") else None
+
+    if config.get("sampler") == "sobol":
+        #randomized QMC: independent scrambles of reps / replicates paths, error from their spread
+        replicates = int(config.get("replicates") or 16)
+        per_replicate = rqmc_paths_per_replicate(config, reps, replicates)
+
+        def replicate(rng):
+            ending_prices = simulate_ending_prices(raw[-1], days, per_replicate, mu, sigma,
+                                                   rng=rng, sampler="sobol")
+            stats = summarize_ending_prices(ending_prices, raw[-1], expected_price)
+            #per replicate SEs are replaced by the spread across replicates, the analytic mean has none
+            return {name: value for name, value in stats.items()
+                    if not name.endswith("_se") and name != "mean_price_analytic"}
+
+        stats = rqmc_replicates(replicate, replicates, seed=config.get("seed") or 0)
+        if expected_price is not None:
+            stats["mean_price_analytic"] = float(expected_price)
+        return {"model": "gbm", "s0": float(raw[-1]), "days": days - 1, "reps": per_replicate * replicates,
+                "mu_daily": float(mu), "sigma_daily": float(sigma), **stats}
+
+    if config.get("sketch") and not config.get("plot"):
+        #bounded memory: ending prices are summarized chunk by chunk, VaR / CVaR come from a quantile sketch
+        if config.get("workers"):
+            from parallel import gbm_terminal_stats_parallel
+            stats = gbm_terminal_stats_parallel(raw[-1], days, reps, mu, sigma, seed=config.get("seed") or 0,
+                                                workers=config["workers"], antithetic=antithetic, dtype=dtype)
+        else:
+            stats = simulate_terminal_stats(raw[-1], days, reps, mu, sigma, antithetic=antithetic, dtype=dtype)
+        return {"model": "gbm", "s0": float(raw[-1]), "days": days - 1, "reps": reps,
+                "mu_daily": float(mu), "sigma_daily": float(sigma), **stats.summary()}
+
+    if config.get("store"):
+        #paths are written to an on-disk store chunk by chunk, the plot and the stats read slices of it
+        from path_store import store_gbm_paths
+        paths, _ = store_gbm_paths(config["store"], raw[-1], days, reps, mu, sigma, seed=config.get("seed") or 0,
+                                   antithetic=antithetic, dtype=dtype)
+        if config.get("plot"):
+            plot_simulations(raw, paths.T, days)
+        ending_prices = np.asarray(paths[-1])
+    elif config.get("workers") and not config.get("plot"):
+        #sharded over a process pool, reproducible for a given seed whatever the worker count
+        from parallel import gbm_ending_prices_parallel
+        ending_prices = gbm_ending_prices_parallel(raw[-1], days, reps, mu, sigma, seed=config.get("seed") or 0,
+                                                   workers=config["workers"], antithetic=antithetic, dtype=dtype)
+    elif config.get("plot"):
+        simulations = vectorize_simulation(raw[-1], days, reps, mu, sigma, antithetic=antithetic, dtype=dtype)
+        plot_simulations(raw, simulations, days)
+        ending_prices = simulations[:, -1]
+    else:
+        #no paths are plotted, so the terminal prices are drawn directly
+        ending_prices = simulate_ending_prices(raw[-1], days, reps, mu, sigma, antithetic=antithetic, dtype=dtype)
+
+    return {
+        "model": "gbm",
+        "s0": float(raw[-1]),
+        "days": days - 1,
+        "reps": reps,
+        "mu_daily": float(mu),
+        "sigma_daily": float(sigma),
+        **summarize_ending_prices(ending_prices, raw[-1], expected_price, antithetic),
+    }
+
+
+#.csv gets a header and one row, anything else is written as JSON, no path prints JSON
+def write_results(result: dict, path: str | None = None):
+    if path is None:
+        print(json.dumps(result, indent=2))
+    elif path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(result))
+            writer.writeheader()
+            writer.writerow(result)
+    else:
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+#--reps takes a path count or "auto" for the adaptive mode
+def reps_arg(value: str):
+    return "auto" if value.lower() == "auto" else int(value)
+
+
+#flags override the values in --config, with no config and no flags the interactive prompt runs
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo price simulator")
+    parser.add_argument("--config", help="JSON job file")
+    parser.add_argument("--file", dest="prices_file", help="price file, e.g. btc.csv")
+    parser.add_argument("--days", type=int, help="number of days to simulate")
+    parser.add_argument("--reps", type=reps_arg, help="number of simulations, or auto to stop at a tolerance")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible runs")
+    parser.add_argument("--workers", type=int, help="shard the paths over this many processes")
+    parser.add_argument("--antithetic", action="store_true", help="use antithetic (z, -z) path pairs")
+    parser.add_argument("--sampler", choices=["pseudo", "sobol"], help="random numbers (default pseudo)")
+    parser.add_argument("--replicates", type=int, help="independent Sobol scrambles for the error estimate")
+    parser.add_argument("--control-variate", dest="control_variate", action="store_true",
+                        help="use the analytic expected price as a control variate")
+    parser.add_argument("--sketch", action="store_true",
+                        help="summarize in bounded memory, VaR / CVaR from a streaming quantile sketch")
+    parser.add_argument("--store", help="write every path to this directory (memmapped .npy + meta.json)")
+    parser.add_argument("--var-tol", dest="var_tol", type=float,
+                        help="with --reps auto: 95%% CI half-width of VaR relative to VaR (default 0.005)")
+    parser.add_argument("--prob-tol", dest="prob_tol", type=float,
+                        help="with --reps auto: 95%% CI half-width of prob. of profit in points (default 0.25)")
+    parser.add_argument("--time-budget", dest="time_budget", type=float,
+                        help="with --reps auto: stop after this many seconds")
+    parser.add_argument("--max-reps", dest="max_reps", type=int, help="with --reps auto: stop after this many paths")
+    parser.add_argument("--dtype", choices=["float64", "float32"],
+                        help="float32 halves memory and bandwidth of the simulated paths (default float64)")
+    parser.add_argument("--out", help="write results to a .csv or .json file (default: print JSON)")
+    parser.add_argument("--plot", action="store_true", help="show the path and histogram plots")
+    return parser.parse_args(argv)
+
+
+def build_config(args) -> dict | None:
+    config = {}
+    if args.config:
+        with open(args.config, "r") as f:
+            config = json.load(f)
+    #0 is a real value (e.g. --seed 0), only unset options and unset store_true flags are skipped
+    for key, value in vars(args).items():
+        if key not in ("config", "out") and value is not None and value is not False:
+            config[key] = value
+    return config or None
+
+
+def cli(argv=None):
+    args = parse_args(argv)
+    config = build_config(args)
+    if config is None:
+        main()
+    else:
+        #keep stdout clean for the JSON result
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_batch(config)
+        write_results(result, args.out)
+
+
 def main():
     while True:
         simulations = []
@@ -64,72 +353,36 @@ def main():
         sigma, mu = calc_sigma_and_mu_daily(raw)
 
         days = int(input("Enter the number of day(s) to simulate: ")) + 1
-        reps = int(input("Enter the number of simulation(s): "))
+        reps = input("Enter the number of simulation(s) (or auto): ")
+
+        if reps.strip().lower() == "auto":
+            #no paths are kept in auto mode, so there is nothing to plot
+            from adaptive import gbm_adaptive
+            stats = gbm_adaptive(raw[-1], days, mu, sigma)
+            print(f"Simulated {stats['n_paths']:,} paths in {stats['seconds']:.2f}s (stopped by {stats['stopped_by']})")
+            print(f"Probability of Profit: {stats['prob_profit']:.2f}% "
+                  f"(95% CI {stats['prob_profit_ci'][0]:.2f}% - {stats['prob_profit_ci'][1]:.2f}%)")
+            print(f"5% Value at Risk (VaR): ${stats['var_5']:.2f} "
+                  f"(95% CI ${stats['var_5_ci'][0]:.2f} - ${stats['var_5_ci'][1]:.2f})")
+            print()
+            continue
+        reps = int(reps)
 
         simulations = vectorize_simulation(raw[-1], days, reps, mu, sigma)
 
         print()
         simulations = np.array(simulations)
-        mean_simulations = simulations.mean(axis=0)
-
-        #how much history to show
-        hist_window = min(len(raw), days)
-        hist_slice = raw[-hist_window:]
-
-        #x ranges
-        hist_x = range(hist_window)  # 0 ... hist_window-1
-        future_x = range(hist_window - 1, hist_window - 1 + days)
 
-        plt.figure(figsize=(12, 6))
+        plot_simulations(raw, simulations, days)
 
-        #historical slice
-        plt.plot(hist_x, hist_slice, label="Historical Price", color="orange")
+        stats = summarize_ending_prices(simulations[:, -1], raw[-1])
 
-        #vertical seperator
-        plt.axvline(
-            x=hist_window - 1,
-            color="black",
-            linestyle="--",
-            linewidth=2,
-            label="Forecast Start"
-        )
-        #first 10 simulated path
-        for path in simulations[:10]:
-            plt.plot(future_x, path, color="grey", linestyle="dashed", alpha=0.4)
-
-        #mean path
-        plt.plot(future_x, mean_simulations, label="Predicted Mean", color="green", linewidth=2)
-
-        plt.title("Historical + Future Prediction")
-        plt.legend()
-
-        plt.show()
-
-        #histogram of ending prices
-        plt.figure(figsize=(12, 6))
-        ending_prices = simulations[:, -1]
-
-        plt.hist(ending_prices, bins=50, color="green", edgecolor="black")
-
-        #5th percentile
-        plt.axvline(np.percentile(ending_prices, 5), color='r', linestyle='dashed', label="5% VaR")
-        plt.title("Distribution of Ending Prices")
-        plt.legend()
-
-        plt.show()
-
-        profit_paths = np.sum(ending_prices > raw[-1])
-        prob_profit = (profit_paths / reps) * 100
-
-        print(f"Probability of Profit: {prob_profit:.2f}%")
-        print(f"5% Value at Risk (VaR): ${np.percentile(ending_prices, 5):.2f}")
+        print(f"Probability of Profit: {stats['prob_profit']:.2f}% (± {stats['prob_profit_se']:.2f}%)")
+        print(f"5% Value at Risk (VaR): ${stats['var_5']:.2f} (± ${stats['var_5_se']:.2f})")
 
         print()
 
 
-
-
-
 if __name__ == "__main__":
-    main()
+    cli()
 
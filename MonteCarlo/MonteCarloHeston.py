@@ -1,5 +1,13 @@
+import argparse
+import contextlib
+import csv
+import json
+import sys
+
 import numpy as np
-import matplotlib.pyplot as plt
+from qmc import rqmc_paths_per_replicate, rqmc_replicates, sobol_normals
+from quantile_sketch import TerminalStats, sketch_seed
+from variance_reduction import draw_normals, summarize_terminal
 
 
 def calc_kappa(list_of_variances: list[float]):
@@ -43,36 +51,228 @@ def get_heston_parameters(prices: list[float]):
     return {"mu": mu, "kappa": kappa, "theta": theta, "xi": xi, "rho": rho, "v0": v0}
 
 
-def simulate_heston(s0, params, days, n_paths):
-    dt = 1 / 365
+#Andersen QE switches from the quadratic to the exponential variance sampler above this psi
+QE_PSI_CRITICAL = 1.5
+
+#weights of V_t and V_t+dt in the integrated variance (trapezoidal, as in Andersen 2008)
+QE_GAMMA_1 = 0.5
+QE_GAMMA_2 = 0.5
+
+
+#one full-truncation Euler step for every path, only accurate for small dt (daily)
+#w1 and w2 are independent normals, the price takes w1 and the variance rho * w1 + sqrt(1 - rho^2) * w2
+def heston_euler_step(S, V, w1, w2, mu, kappa, theta, xi, rho, dt):
+    z_vol = rho * w1 + np.sqrt(1 - rho ** 2) * w2
+
+    #full truncation
+    V_prev = np.maximum(V, 0)
+    sqrt_V_dt = np.sqrt(V_prev * dt)
+
+    #CIR process
+    V_next = V_prev + (kappa * (theta - V_prev) * dt + xi * sqrt_V_dt * z_vol)
+
+    #update price
+    S_next = S * np.exp((mu - 0.5 * V_prev) * dt + sqrt_V_dt * w1)
+    return S_next, V_next
+
+
+#one Andersen quadratic-exponential step, stays accurate with weekly or monthly dt
+#w1 drives the variance (via U = Phi(w1) in the exponential branch) and w2 is the independent price shock,
+#rho enters through the V_t+dt term of the log price
+def heston_qe_step(S, V, w1, w2, mu, kappa, theta, xi, rho, dt):
+    #scipy is only needed by this scheme, euler runs never import it
+    from scipy.special import ndtr
+
+    V = np.maximum(V, 0)
+
+    #floors must stay above zero in the working precision (1e-300 is 0 in float32)
+    tiny = np.finfo(V.dtype).tiny
+
+    #conditional mean and variance of the CIR variance over dt
+    decay = np.exp(-kappa * dt)
+    m = np.maximum(theta + (V - theta) * decay, tiny)
+    s2 = np.maximum(V * xi ** 2 * decay / kappa * (1 - decay) + theta * xi ** 2 / (2 * kappa) * (1 - decay) ** 2, 0)
+    psi = np.maximum(s2 / m ** 2, 1e-12)
+    quadratic = psi <= QE_PSI_CRITICAL
+
+    #quadratic branch: V_next = a * (b + w1)^2
+    inv_psi = 2 / np.where(quadratic, psi, 1.0)
+    b2 = inv_psi - 1 + np.sqrt(inv_psi * (inv_psi - 1))
+    a = m / (1 + b2)
+
+    #exponential branch: mass p at zero and an exponential tail with rate beta
+    p = np.where(quadratic, 0.0, (psi - 1) / (psi + 1))
+    beta = (1 - p) / m
+    #1 - U is taken as Phi(-w1) directly, 1 - Phi(w1) rounds to 0 for large w1 (from about 5.3 in float32)
+    survival = ndtr(-w1)
+    tail = np.log((1 - p) / np.maximum(survival, tiny)) / beta
+
+    V_next = np.where(quadratic, a * (np.sqrt(b2) + w1) ** 2, np.where(survival >= 1 - p, 0.0, tail))
+
+    #log price coefficients
+    k0 = -rho * kappa * theta / xi * dt
+    k1 = QE_GAMMA_1 * dt * (kappa * rho / xi - 0.5) - rho / xi
+    k2 = QE_GAMMA_2 * dt * (kappa * rho / xi - 0.5) + rho / xi
+    k3 = QE_GAMMA_1 * dt * (1 - rho ** 2)
+    k4 = QE_GAMMA_2 * dt * (1 - rho ** 2)
+
+    #martingale correction: K0 is chosen so E[S_t+dt | S_t, V_t] = S_t * exp(mu * dt) exactly,
+    #it needs log E[exp(A * V_next)], which only exists for A below 1 / (2a) or beta
+    A = k2 + 0.5 * k4
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_moment = np.where(quadratic,
+                              A * b2 * a / (1 - 2 * A * a) - 0.5 * np.log(1 - 2 * A * a),
+                              np.log(p + beta * (1 - p) / (beta - A)))
+    corrected = np.where(quadratic, A < 1 / (2 * a), A < beta)
+    drift = np.where(corrected, -log_moment - 0.5 * k3 * V, k0 + k1 * V)
+
+    S_next = S * np.exp(mu * dt + drift + k2 * V_next + np.sqrt(k3 * V + k4 * V_next) * w2)
+    return S_next, V_next
+
+
+HESTON_SCHEMES = {"euler": heston_euler_step, "qe": heston_qe_step}
+
+
+#heston_euler_step with the same arithmetic done in place: S and V are updated where they are,
+#w1 and w2 are used up and a, b are scratch buffers, so a step allocates nothing
+def heston_euler_step_inplace(S, V, w1, w2, mu, kappa, theta, xi, rho, dt, a, b):
+    #w2 becomes the variance shock
+    w2 *= np.sqrt(1 - rho ** 2)
+    np.multiply(w1, rho, out=a)
+    w2 += a
+
+    #full truncation, a = sqrt(V dt)
+    np.maximum(V, 0, out=V)
+    np.multiply(V, dt, out=a)
+    np.sqrt(a, out=a)
+
+    #price, w1 becomes the log return
+    np.multiply(V, -0.5, out=b)
+    b += mu
+    b *= dt
+    w1 *= a
+    w1 += b
+    np.exp(w1, out=w1)
+    S *= w1
+
+    #CIR process
+    np.subtract(theta, V, out=b)
+    b *= kappa
+    b *= dt
+    a *= xi
+    w2 *= a
+    b += w2
+    V += b
+
+
+#advance(S, V, w1, w2, mu, kappa, theta, xi, rho, dt) updates S and V in place,
+#euler runs allocation free on two scratch buffers, other schemes write their new arrays back
+def _in_place_stepper(scheme, n_paths, dtype):
+    if scheme == "euler":
+        a = np.empty(n_paths, dtype)
+        b = np.empty(n_paths, dtype)
+        return lambda S, V, w1, w2, *args: heston_euler_step_inplace(S, V, w1, w2, *args, a, b)
+
+    step = HESTON_SCHEMES[scheme]
+
+    def advance(S, V, w1, w2, *args):
+        S[...], V[...] = step(S, V, w1, w2, *args)
+    return advance
+
+
+#year fractions of each step: step_days at a time, the last step takes whatever is left of days - 1
+def heston_time_steps(days, step_days=1):
+    full, rest = divmod(days - 1, step_days)
+    return [step_days / 365] * full + ([rest / 365] if rest else [])
+
+
+#rng can be a np.random.Generator, by default the global np.random state is used
+#antithetic=True puts (z, -z) pairs in neighbouring columns, an odd n_paths gets one extra path
+#sampler="sobol" swaps the pseudo-random draws for scrambled Sobol points on a Brownian bridge
+#scheme is "euler" or "qe", rows of S and V sit every step_days days (row 0 is the start)
+#dtype=np.float32 halves the memory and bandwidth of the matrices
+def simulate_heston(s0, params, days, n_paths, rng=None, antithetic=False, sampler="pseudo", scheme="euler",
+                    step_days=1, dtype=np.float64):
+    rng = np.random if rng is None else rng
+    if antithetic:
+        if sampler == "sobol":
+            raise ValueError("antithetic pairs are not combined with the Sobol sampler")
+        n_paths += n_paths % 2
+    advance = _in_place_stepper(scheme, n_paths, dtype)
+    dts = heston_time_steps(days, step_days)
     mu, kappa, theta, xi, rho, v0 = params.values()
 
     #pre-allocate matrices
-    S = np.zeros((days, n_paths))
-    V = np.zeros((days, n_paths))
+    S = np.zeros((len(dts) + 1, n_paths), dtype)
+    V = np.zeros((len(dts) + 1, n_paths), dtype)
     S[0] = s0
     V[0] = v0
 
-    #correlated bm
-    W1 = np.random.normal(0, 1, (days, n_paths))
-    W2 = np.random.normal(0, 1, (days, n_paths))
-    Z_price = W1
-    Z_vol = rho * W1 + np.sqrt(1 - rho ** 2) * W2
+    #independent bm, row 0 is the starting point and never used as a shock
+    if sampler == "sobol":
+        W1 = np.zeros((len(dts) + 1, n_paths), dtype)
+        W2 = np.zeros((len(dts) + 1, n_paths), dtype)
+        W1[1:], W2[1:] = (w.T for w in sobol_normals(n_paths, len(dts), rng, n_factors=2))
+    else:
+        W1 = draw_normals(rng, (len(dts) + 1, n_paths), antithetic, axis=1, dtype=dtype)
+        W2 = draw_normals(rng, (len(dts) + 1, n_paths), antithetic, axis=1, dtype=dtype)
 
-    for t in range(1, days):
-        #full truncation
-        V_prev = np.maximum(V[t - 1], 0)
+    #each row starts as a copy of the previous one and is stepped in place
+    for t, dt in enumerate(dts, start=1):
+        S[t] = S[t - 1]
+        V[t] = V[t - 1]
+        advance(S[t], V[t], W1[t], W2[t], mu, kappa, theta, xi, rho, dt)
 
-        #CIR process
-        dV = kappa * (theta - V_prev) * dt + xi * np.sqrt(V_prev * dt) * Z_vol[t]
-        V[t] = V_prev + dV
+    return S, V
 
-        #update price
-        dS_drift = (mu - 0.5 * V_prev) * dt
-        dS_diff = np.sqrt(V_prev * dt) * Z_price[t]
-        S[t] = S[t - 1] * np.exp(dS_drift + dS_diff)
 
-    return S, V
+#same model as simulate_heston but only the current S/V vectors are kept, memory is O(n_paths)
+#normals are drawn block_size steps at a time, and the running max/min/average are tracked per path
+#S, V and the path stats are updated in place, a step allocates nothing with the euler scheme
+def simulate_heston_streaming(s0, params, days, n_paths, block_size=32, rng=None, antithetic=False,
+                              scheme="euler", step_days=1, dtype=np.float64):
+    rng = np.random if rng is None else rng
+    if antithetic:
+        n_paths += n_paths % 2
+    advance = _in_place_stepper(scheme, n_paths, dtype)
+    dts = heston_time_steps(days, step_days)
+    mu, kappa, theta, xi, rho = (params[name] for name in ("mu", "kappa", "theta", "xi", "rho"))
+
+    S = np.full(n_paths, s0, dtype)
+    V = np.full(n_paths, params["v0"], dtype)
+
+    #row 0 of the matrix version is s0, so it counts towards the path stats too
+    running_max = S.copy()
+    running_min = S.copy()
+    path_sum = S.copy()
+
+    for start in range(0, len(dts), block_size):
+        block = dts[start:start + block_size]
+
+        #independent bm for this block only
+        W1 = draw_normals(rng, (len(block), n_paths), antithetic, axis=1, dtype=dtype)
+        W2 = draw_normals(rng, (len(block), n_paths), antithetic, axis=1, dtype=dtype)
+
+        for k, dt in enumerate(block):
+            advance(S, V, W1[k], W2[k], mu, kappa, theta, xi, rho, dt)
+            np.maximum(running_max, S, out=running_max)
+            np.minimum(running_min, S, out=running_min)
+            path_sum += S
+
+    return {"S": S, "V": V, "max": running_max, "min": running_min, "mean": path_sum / (len(dts) + 1)}
+
+
+#terminal stats in bounded memory: chunks of paths are streamed and their ending prices
+#feed a running sum and a quantile sketch, so memory is O(chunk_size) for any n_paths
+def simulate_heston_terminal_stats(s0, params, days, n_paths, chunk_size=100_000, rng=None, antithetic=False,
+                                   k=2048, scheme="euler", step_days=1, dtype=np.float64):
+    rng = np.random if rng is None else rng
+    stats = TerminalStats(s0, k, sketch_seed(rng), antithetic)
+    for start in range(0, n_paths, chunk_size):
+        chunk = min(chunk_size, n_paths - start)
+        stats.update(simulate_heston_streaming(s0, params, days, chunk, rng=rng, antithetic=antithetic,
+                                               scheme=scheme, step_days=step_days, dtype=dtype)["S"])
+    return stats
 
 
 def parse_numbers(raw: str) -> list[float]:
@@ -94,6 +294,258 @@ def load_numbers_from_file(path: str) -> list[float]:
         return []
 
 
+#E[S_T] of the discretized model, each Euler step (and each martingale corrected QE step)
+#has E[S_t | S_t-1, V_t-1] = S_t-1 * exp(mu * dt) so it is exact and works as a control variate
+def heston_expected_price(s0, params, days):
+    return s0 * np.exp(params["mu"] * (days - 1) / 365)
+
+
+#probability of profit and 5% VaR from the simulated ending prices, each with its standard error
+def summarize_ending_prices(ending_prices, s0, expected_price=None, antithetic=False):
+    return summarize_terminal(ending_prices, s0, expected_price, antithetic)
+
+
+#matplotlib is only imported when a plot is actually requested
+def plot_simulations(raw, simulations, days):
+    import matplotlib.pyplot as plt
+
+    mean_simulations = simulations.mean(axis=0)
+
+    #how much history to show
+    hist_window = min(len(raw), days)
+    hist_slice = raw[-hist_window:]
+
+    #X ranges
+    hist_x = range(hist_window)
+    #future x starts at the last historical point
+    future_x = range(hist_window - 1, hist_window - 1 + days)
+
+    plt.figure(figsize=(12, 6))
+
+    #historical slice
+    plt.plot(hist_x, hist_slice, label="Historical Price", color="orange")
+
+    # Vertical separator
+    plt.axvline(
+        x=hist_window - 1,
+        color="black",
+        linestyle="--",
+        linewidth=2,
+        label="Forecast Start"
+    )
+
+    #first 10 simulated paths
+    for path in simulations[:10]:
+        plt.plot(future_x, path, color="grey", linestyle="dashed", alpha=0.4)
+
+    #mean path
+    plt.plot(future_x, mean_simulations, label="Predicted Mean", color="green", linewidth=2)
+
+    plt.title(f"Heston Model: Historical + Future Prediction ({days - 1} Days)")
+    plt.xlabel("Time Steps")
+    plt.ylabel("Price")
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.show()
+
+    #histogram of ending prices
+    plt.figure(figsize=(12, 6))
+    ending_prices = simulations[:, -1]
+
+    plt.hist(ending_prices, bins=50, color="green", edgecolor="black", alpha=0.7)
+
+    # 5% VaR
+    var_price = np.percentile(ending_prices, 5)
+    plt.axvline(var_price, color='r', linestyle='dashed', linewidth=2, label=f"5% VaR: ${var_price:.2f}")
+
+    plt.title("Distribution of Ending Prices (Heston)")
+    plt.xlabel("Price")
+    plt.ylabel("Frequency")
+    plt.legend()
+    plt.show()
+
+
+#headless run: config has prices_file, days, reps and optionally seed and plot
+def run_batch(config: dict) -> dict:
+    raw = load_numbers_from_file(config["prices_file"])
+    if not raw:
+        raise ValueError(f"No prices loaded from {config['prices_file']}")
+
+    if config.get("seed") is not None:
+        np.random.seed(config["seed"])
+
+    if config.get("calibrate"):
+        #quasi-MLE fit, served from the calibration cache when the data has not changed
+        from heston_calibration import DEFAULT_CACHE, calibrate_files
+        fits = calibrate_files([config["prices_file"]], config.get("calibration_cache", DEFAULT_CACHE), workers=1)
+        params = fits[config["prices_file"]]["params"]
+    else:
+        params = get_heston_parameters(raw)
+    days = int(config["days"]) + 1
+
+    antithetic = bool(config.get("antithetic"))
+    scheme = config.get("scheme", "euler")
+    step_days = int(config.get("step_days", 1))
+    dtype = np.dtype(config.get("dtype", "float64"))
+
+    if str(config["reps"]).lower() == "auto":
+        #adaptive: batches of paths until the VaR and probability of profit intervals meet the tolerances
+        from adaptive import adaptive_options, heston_adaptive
+        stats = heston_adaptive(raw[-1], params, days, scheme=scheme, step_days=step_days,
+                                **adaptive_options(config))
+        return {"model": "heston", "s0": float(raw[-1]), "days": days - 1, "reps": "auto",
+                **{name: float(value) for name, value in params.items()}, **stats}
+    reps = int(config["reps"])
+    expected_price = heston_expected_price(raw[-1], params, days) if config.get("control_variate") else None
+
+    if config.get("sampler") == "sobol":
+        #randomized QMC: independent scrambles of reps / replicates paths, error from their spread
+        replicates = int(config.get("replicates") or 16)
+        per_replicate = rqmc_paths_per_replicate(config, reps, replicates)
+
+        def replicate(rng):
+            S_matrix, _ = simulate_heston(raw[-1], params, days, per_replicate, rng=rng, sampler="sobol",
+                                          scheme=scheme, step_days=step_days)
+            stats = summarize_ending_prices(S_matrix[-1], raw[-1], expected_price)
+            #per replicate SEs are replaced by the spread across replicates, the analytic mean has none
+            return {name: value for name, value in stats.items()
+                    if not name.endswith("_se") and name != "mean_price_analytic"}
+
+        stats = rqmc_replicates(replicate, replicates, seed=config.get("seed") or 0)
+        if expected_price is not None:
+            stats["mean_price_analytic"] = float(expected_price)
+        return {"model": "heston", "s0": float(raw[-1]), "days": days - 1, "reps": per_replicate * replicates,
+                **{name: float(value) for name, value in params.items()}, **stats}
+
+    if config.get("sketch") and not config.get("plot"):
+        #bounded memory: paths are streamed in chunks, VaR / CVaR come from a quantile sketch
+        if config.get("workers"):
+            from parallel import heston_terminal_stats_parallel
+            stats = heston_terminal_stats_parallel(raw[-1], params, days, reps, seed=config.get("seed") or 0,
+                                                   workers=config["workers"], antithetic=antithetic,
+                                                   scheme=scheme, step_days=step_days, dtype=dtype)
+        else:
+            stats = simulate_heston_terminal_stats(raw[-1], params, days, reps, antithetic=antithetic,
+                                                   scheme=scheme, step_days=step_days, dtype=dtype)
+        return {"model": "heston", "s0": float(raw[-1]), "days": days - 1, "reps": reps,
+                **{name: float(value) for name, value in params.items()}, **stats.summary()}
+
+    #full path matrices only when they are stored or plotted (plots use daily steps, one point per day),
+    #otherwise stream in O(reps) memory
+    if config.get("store"):
+        #paths are written to an on-disk store chunk by chunk, the plot and the stats read slices of it
+        from path_store import store_heston_paths
+        paths, _ = store_heston_paths(config["store"], raw[-1], params, days, reps, seed=config.get("seed") or 0,
+                                      antithetic=antithetic, scheme=scheme,
+                                      step_days=1 if config.get("plot") else step_days, dtype=dtype)
+        if config.get("plot"):
+            plot_simulations(raw, paths.T, days)
+        ending_prices = np.asarray(paths[-1])
+    elif config.get("plot"):
+        S_matrix, V_matrix = simulate_heston(raw[-1], params, days, reps, antithetic=antithetic, scheme=scheme,
+                                             dtype=dtype)
+        simulations = S_matrix.T
+        plot_simulations(raw, simulations, days)
+        ending_prices = simulations[:, -1]
+    elif config.get("workers"):
+        #sharded over a process pool, reproducible for a given seed whatever the worker count
+        from parallel import heston_ending_prices_parallel
+        ending_prices = heston_ending_prices_parallel(raw[-1], params, days, reps, seed=config.get("seed") or 0,
+                                                      workers=config["workers"], antithetic=antithetic,
+                                                      scheme=scheme, step_days=step_days, dtype=dtype)
+    else:
+        ending_prices = simulate_heston_streaming(raw[-1], params, days, reps, antithetic=antithetic,
+                                                  scheme=scheme, step_days=step_days, dtype=dtype)["S"]
+
+    return {
+        "model": "heston",
+        "s0": float(raw[-1]),
+        "days": days - 1,
+        "reps": reps,
+        **{name: float(value) for name, value in params.items()},
+        **summarize_ending_prices(ending_prices, raw[-1], expected_price, antithetic),
+    }
+
+
+#.csv gets a header and one row, anything else is written as JSON, no path prints JSON
+def write_results(result: dict, path: str | None = None):
+    if path is None:
+        print(json.dumps(result, indent=2))
+    elif path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(result))
+            writer.writeheader()
+            writer.writerow(result)
+    else:
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+#--reps takes a path count or "auto" for the adaptive mode
+def reps_arg(value: str):
+    return "auto" if value.lower() == "auto" else int(value)
+
+
+#flags override the values in --config, with no config and no flags the interactive prompt runs
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Heston stochastic volatility simulator")
+    parser.add_argument("--config", help="JSON job file")
+    parser.add_argument("--file", dest="prices_file", help="price file, e.g. btc.csv")
+    parser.add_argument("--days", type=int, help="number of days to simulate")
+    parser.add_argument("--reps", type=reps_arg, help="number of simulations, or auto to stop at a tolerance")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible runs")
+    parser.add_argument("--workers", type=int, help="shard the paths over this many processes")
+    parser.add_argument("--antithetic", action="store_true", help="use antithetic (z, -z) path pairs")
+    parser.add_argument("--sampler", choices=["pseudo", "sobol"], help="random numbers (default pseudo)")
+    parser.add_argument("--replicates", type=int, help="independent Sobol scrambles for the error estimate")
+    parser.add_argument("--control-variate", dest="control_variate", action="store_true",
+                        help="use the analytic expected price as a control variate")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="fit the parameters by quasi-MLE (cached by data hash) instead of moment heuristics")
+    parser.add_argument("--scheme", choices=list(HESTON_SCHEMES), help="discretization (default euler)")
+    parser.add_argument("--step-days", dest="step_days", type=int,
+                        help="days per time step, use weekly or monthly steps with --scheme qe")
+    parser.add_argument("--sketch", action="store_true",
+                        help="summarize in bounded memory, VaR / CVaR from a streaming quantile sketch")
+    parser.add_argument("--store", help="write every path to this directory (memmapped .npy + meta.json)")
+    parser.add_argument("--var-tol", dest="var_tol", type=float,
+                        help="with --reps auto: 95%% CI half-width of VaR relative to VaR (default 0.005)")
+    parser.add_argument("--prob-tol", dest="prob_tol", type=float,
+                        help="with --reps auto: 95%% CI half-width of prob. of profit in points (default 0.25)")
+    parser.add_argument("--time-budget", dest="time_budget", type=float,
+                        help="with --reps auto: stop after this many seconds")
+    parser.add_argument("--max-reps", dest="max_reps", type=int, help="with --reps auto: stop after this many paths")
+    parser.add_argument("--dtype", choices=["float64", "float32"],
+                        help="float32 halves memory and bandwidth of the simulated paths (default float64)")
+    parser.add_argument("--out", help="write results to a .csv or .json file (default: print JSON)")
+    parser.add_argument("--plot", action="store_true", help="show the path and histogram plots")
+    return parser.parse_args(argv)
+
+
+def build_config(args) -> dict | None:
+    config = {}
+    if args.config:
+        with open(args.config, "r") as f:
+            config = json.load(f)
+    #0 is a real value (e.g. --seed 0), only unset options and unset store_true flags are skipped
+    for key, value in vars(args).items():
+        if key not in ("config", "out") and value is not None and value is not False:
+            config[key] = value
+    return config or None
+
+
+def cli(argv=None):
+    args = parse_args(argv)
+    config = build_config(args)
+    if config is None:
+        main()
+    else:
+        #keep stdout clean for the JSON result
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_batch(config)
+        write_results(result, args.out)
+
+
 def main():
     while True:
         filename = input("Enter the filename with extension (e to exit): ")
@@ -106,11 +558,24 @@ def main():
 
         try:
             days = int(input("Enter the number of day(s) to simulate: ")) + 1
-            reps = int(input("Enter the number of simulation(s): "))
+            reps = input("Enter the number of simulation(s) (or auto): ")
+            reps = reps if reps.strip().lower() == "auto" else int(reps)
         except ValueError:
             print("Invalid input.")
             continue
 
+        if reps == "auto":
+            #no paths are kept in auto mode, so there is nothing to plot
+            from adaptive import heston_adaptive
+            stats = heston_adaptive(raw[-1], params, days)
+            print(f"Simulated {stats['n_paths']:,} paths in {stats['seconds']:.2f}s (stopped by {stats['stopped_by']})")
+            print(f"Probability of Profit: {stats['prob_profit']:.2f}% "
+                  f"(95% CI {stats['prob_profit_ci'][0]:.2f}% - {stats['prob_profit_ci'][1]:.2f}%)")
+            print(f"5% Value at Risk (VaR): ${stats['var_5']:.2f} "
+                  f"(95% CI ${stats['var_5_ci'][0]:.2f} - ${stats['var_5_ci'][1]:.2f})")
+            print()
+            continue
+
         print("\nRunning Heston Simulation...")
         print(
             f"Parameters: Mu={params['mu']:.2f}, Theta={params['theta']:.2f}, Xi={params['xi']:.2f}, Rho={params['rho']:.2f}")
@@ -123,69 +588,15 @@ def main():
         print("\nPlotting results...")
 
         simulations = np.array(simulations)
-        mean_simulations = simulations.mean(axis=0)
-
-        #how much history to show
-        hist_window = min(len(raw), days)
-        hist_slice = raw[-hist_window:]
-
-        #X ranges
-        hist_x = range(hist_window)
-        #future x starts at the last historical point
-        future_x = range(hist_window - 1, hist_window - 1 + days)
-
-        plt.figure(figsize=(12, 6))
-
-        #historical slice
-        plt.plot(hist_x, hist_slice, label="Historical Price", color="orange")
-
-        # Vertical separator
-        plt.axvline(
-            x=hist_window - 1,
-            color="black",
-            linestyle="--",
-            linewidth=2,
-            label="Forecast Start"
-        )
-
-        #first 10 simulated paths
-        for path in simulations[:10]:
-            plt.plot(future_x, path, color="grey", linestyle="dashed", alpha=0.4)
-
-        #mean path
-        plt.plot(future_x, mean_simulations, label="Predicted Mean", color="green", linewidth=2)
-
-        plt.title(f"Heston Model: Historical + Future Prediction ({days - 1} Days)")
-        plt.xlabel("Time Steps")
-        plt.ylabel("Price")
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.show()
-
-        #histogram of ending prices
-        plt.figure(figsize=(12, 6))
-        ending_prices = simulations[:, -1]
-
-        plt.hist(ending_prices, bins=50, color="green", edgecolor="black", alpha=0.7)
-
-        # 5% VaR
-        var_price = np.percentile(ending_prices, 5)
-        plt.axvline(var_price, color='r', linestyle='dashed', linewidth=2, label=f"5% VaR: ${var_price:.2f}")
-
-        plt.title("Distribution of Ending Prices (Heston)")
-        plt.xlabel("Price")
-        plt.ylabel("Frequency")
-        plt.legend()
-        plt.show()
+        plot_simulations(raw, simulations, days)
 
         #stats
-        profit_paths = np.sum(ending_prices > raw[-1])
-        prob_profit = (profit_paths / reps) * 100
+        stats = summarize_ending_prices(simulations[:, -1], raw[-1])
 
-        print(f"Probability of Profit: {prob_profit:.2f}%")
-        print(f"5% Value at Risk (VaR): ${var_price:.2f}")
+        print(f"Probability of Profit: {stats['prob_profit']:.2f}% (± {stats['prob_profit_se']:.2f}%)")
+        print(f"5% Value at Risk (VaR): ${stats['var_5']:.2f} (± ${stats['var_5_se']:.2f})")
         print()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+from MonteCarloGBM import simulate_terminal
+from MonteCarloHeston import simulate_heston_streaming
+from quantile_sketch import Z_95, TerminalStats, quantile_interval, sketch_seed
+
+DEFAULT_BATCH = 20_000
+DEFAULT_MAX_PATHS = 10_000_000
+
+#default targets: VaR known to within 0.5% of its value, probability of profit to within 0.25 points
+DEFAULT_VAR_TOL = 0.005
+DEFAULT_PROB_TOL = 0.25
+
+
+#95% interval of the probability of profit in percent, binomial standard error
+def probability_interval(n_profit, n):
+    p = n_profit / n
+    half = Z_95 * np.sqrt(p * (1 - p) / n)
+    return 100 * (p - half), 100 * (p + half)
+
+
+#draw(n) returns n ending prices, batches are drawn until the 95% intervals of VaR (relative to VaR)
+#and probability of profit (percentage points) are within tolerance, or max_paths / time_budget (seconds) is hit
+def run_adaptive(draw, s0, var_tol=DEFAULT_VAR_TOL, prob_tol=DEFAULT_PROB_TOL, batch_size=DEFAULT_BATCH,
+                 max_paths=DEFAULT_MAX_PATHS, time_budget=None, level=0.05, seed=0):
+    if batch_size <= 0 or max_paths < batch_size:
+        raise ValueError(f"need max_paths >= batch_size > 0, got max_paths={max_paths}, batch_size={batch_size}")
+    stats = TerminalStats(s0, seed=seed)
+    start = time.perf_counter()
+    stop = "max_paths"
+
+    while stats.count < max_paths:
+        stats.update(draw(min(batch_size, max_paths - stats.count)))
+
+        var_low, var_high = quantile_interval(stats.sketch, level, stats.count)
+        prob_low, prob_high = probability_interval(stats.n_profit, stats.count)
+        var_half = 0.5 * (var_high - var_low)
+        prob_half = 0.5 * (prob_high - prob_low)
+
+        if var_half <= var_tol * abs(float(stats.sketch.quantile(level))) and prob_half <= prob_tol:
+            stop = "tolerance"
+            break
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            stop = "time_budget"
+            break
+
+    return {
+        **stats.summary(level),
+        "var_5_ci": [var_low, var_high],
+        "prob_profit_ci": [prob_low, prob_high],
+        "converged": stop == "tolerance",
+        "stopped_by": stop,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def gbm_adaptive(s0, days, mu, sigma, rng=None, **options):
+    rng = np.random if rng is None else rng
+    return run_adaptive(lambda n: simulate_terminal(s0, days, n, mu, sigma, rng), s0, seed=sketch_seed(rng),
+                        **options)
+
+
+def heston_adaptive(s0, params, days, rng=None, scheme="euler", step_days=1, **options):
+    rng = np.random if rng is None else rng
+
+    def draw(n):
+        return simulate_heston_streaming(s0, params, days, n, rng=rng, scheme=scheme, step_days=step_days)["S"]
+
+    return run_adaptive(draw, s0, seed=sketch_seed(rng), **options)
+
+
+#run_batch options auto mode does not implement, they raise instead of being silently dropped
+ADAPTIVE_UNSUPPORTED = ("antithetic", "control_variate", "workers", "sketch", "store", "plot")
+
+
+#tolerance and budget options of a batch config, missing keys keep the defaults
+def adaptive_options(config):
+    used = [name for name in ADAPTIVE_UNSUPPORTED if config.get(name)]
+    if config.get("sampler", "pseudo") != "pseudo":
+        used.append(f"sampler {config['sampler']}")
+    dtype = np.dtype(config.get("dtype") or "float64")
+    if dtype != np.float64:
+        used.append(f"dtype {dtype.name}")
+    if used:
+        raise ValueError(f"reps auto does not support {', '.join(used)}")
+
+    names = {"var_tol": float, "prob_tol": float, "batch_size": int, "max_reps": int, "time_budget": float}
+    options = {name: cast(config[name]) for name, cast in names.items() if config.get(name) is not None}
+    if "max_reps" in options:
+        options["max_paths"] = options.pop("max_reps")
+        #a cap below the default batch is one batch of that size
+        if "batch_size" not in options and 0 < options["max_paths"] < DEFAULT_BATCH:
+            options["batch_size"] = options["max_paths"]
+    return options
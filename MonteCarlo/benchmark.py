@@ -0,0 +1,256 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+from MonteCarloGBM import vectorize_simulation, wiener_process_daily
+from MonteCarloHeston import simulate_heston, simulate_heston_streaming
+from variance_reduction import standard_normal, summarize_terminal
+
+DEFAULT_DAYS = (30, 365)
+DEFAULT_PATHS = (1_000, 100_000)
+
+#fixed model inputs so results compare across machines and data files
+S0 = 100.0
+MU_DAILY = 0.0002
+SIGMA_DAILY = 0.02
+HESTON_PARAMS = {"mu": 0.05, "kappa": 2.0, "theta": 0.04, "xi": 0.5, "rho": -0.7, "v0": 0.04}
+
+#the python loop engine is skipped above this many path-steps
+LOOP_MAX = 1_000_000
+
+#each timed repeat runs the case back to back for at least this long, shorter windows are
+#dominated by timer and scheduler noise and would trip the regression check on identical code
+MIN_REPEAT_SECONDS = 0.2
+
+#times a case flagged as a regression is measured again before it is reported
+CONFIRM_RUNS = 2
+
+#a case counts as a regression when throughput drops more than this vs the baseline
+DEFAULT_TOLERANCE = 0.2
+
+
+#each case has run(days, paths) -> ending prices and draw(days, paths), which makes the same
+#random draws as run, so the time of run splits into rng and arithmetic
+def _wiener_run(days, paths):
+    return np.array([wiener_process_daily(S0, days, MU_DAILY, SIGMA_DAILY)[-1] for _ in range(paths)])
+
+
+def _wiener_draw(days, paths):
+    for _ in range(days * paths):
+        np.random.normal(0, 1)
+
+
+def _vectorize_run(days, paths):
+    return vectorize_simulation(S0, days, paths, MU_DAILY, SIGMA_DAILY)[:, -1]
+
+
+def _vectorize_draw(days, paths):
+    np.random.normal(0, 1, (paths, days))
+
+
+#global np.random state like the float64 case and the CLI, so the float32 fill of legacy draws is measured
+def _vectorize32_run(days, paths):
+    return vectorize_simulation(S0, days, paths, MU_DAILY, SIGMA_DAILY, dtype=np.float32)[:, -1]
+
+
+def _vectorize32_draw(days, paths):
+    standard_normal(np.random, (paths, days), np.float32)
+
+
+def _heston_run(days, paths):
+    return simulate_heston(S0, HESTON_PARAMS, days + 1, paths)[0][-1]
+
+
+#simulate_heston draws both matrices including the unused row 0
+def _heston_draw(days, paths):
+    np.random.normal(0, 1, (days + 1, paths))
+    np.random.normal(0, 1, (days + 1, paths))
+
+
+def _heston_streaming_run(days, paths):
+    return simulate_heston_streaming(S0, HESTON_PARAMS, days + 1, paths)["S"]
+
+
+def _heston_streaming_draw(days, paths):
+    np.random.normal(0, 1, (days, paths))
+    np.random.normal(0, 1, (days, paths))
+
+
+CASES = {
+    "wiener_process_daily": (_wiener_run, _wiener_draw),
+    "vectorize_simulation": (_vectorize_run, _vectorize_draw),
+    "vectorize_simulation/float32": (_vectorize32_run, _vectorize32_draw),
+    "simulate_heston": (_heston_run, _heston_draw),
+    "simulate_heston_streaming": (_heston_streaming_run, _heston_streaming_draw),
+}
+
+
+#how many back to back calls fill MIN_REPEAT_SECONDS, doubling like timeit's autorange (also warms up)
+def _calls_per_repeat(fn, days, paths):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(days, paths)
+        if time.perf_counter() - start >= MIN_REPEAT_SECONDS:
+            return number
+        number *= 2
+
+
+#garbage collection is paused while timing like timeit does
+def _best_time(fn, days, paths, repeat):
+    number = _calls_per_repeat(fn, days, paths)
+    best = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                result = fn(days, paths)
+            best = min(best, (time.perf_counter() - start) / number)
+    finally:
+        gc.enable()
+    return best, result
+
+
+#peak resident set in KB of this process. linux keeps ru_maxrss across fork and exec, so a child started
+#from a big parent would report the parent's peak, VmHWM belongs to the process image and starts fresh
+def _high_water_kb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    import resource
+
+    #ru_maxrss is in KB on linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e3 if sys.platform == "darwin" else float(peak)
+
+
+#runs once in a fresh process, so the peak is this case alone (plus the interpreter and imports)
+#returns (peak MB, MB added by the case)
+def _peak_rss_child(args):
+    name, days, paths = args
+    before = _high_water_kb()
+    CASES[name][0](days, paths)
+    after = _high_water_kb()
+    return after / 1e3, (after - before) / 1e3
+
+
+def peak_rss(name, days, paths):
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_peak_rss_child, ((name, days, paths),))
+
+
+#best wall time over `repeat` runs, the rng / arithmetic / stats split, then peak RSS in a subprocess
+def measure(name, days, paths, repeat=3, rss=True):
+    run, draw = CASES[name]
+
+    np.random.seed(0)
+    total, ending_prices = _best_time(run, days, paths, repeat)
+    rng_time, _ = _best_time(draw, days, paths, repeat)
+
+    start = time.perf_counter()
+    summarize_terminal(ending_prices, S0)
+    stats_time = time.perf_counter() - start
+
+    result = {
+        "days": days,
+        "paths": paths,
+        "seconds": total,
+        "path_steps_per_sec": days * paths / total,
+        "split": {"rng": rng_time, "arithmetic": max(total - rng_time, 0.0), "stats": stats_time},
+    }
+    if rss:
+        result["peak_rss_mb"], result["case_rss_mb"] = peak_rss(name, days, paths)
+    return result
+
+
+def run_benchmarks(days_grid=DEFAULT_DAYS, paths_grid=DEFAULT_PATHS, cases=None, repeat=3, loop_max=LOOP_MAX,
+                   rss=True):
+    results = {}
+    for name in CASES:
+        if cases and name not in cases:
+            continue
+        for days in days_grid:
+            for paths in paths_grid:
+                if name == "wiener_process_daily" and days * paths > loop_max:
+                    continue
+                key = f"{name}/{days}/{paths}"
+                results[key] = measure(name, days, paths, repeat, rss)
+                split = results[key]["split"]
+                print(f"{key:<44} {results[key]['path_steps_per_sec']:>14,.0f} path-steps/s "
+                      f"rng {split['rng']:.3f}s arith {split['arithmetic']:.3f}s stats {split['stats']:.3f}s"
+                      + (f" {results[key]['peak_rss_mb']:>8.1f} MB peak" if rss else ""), file=sys.stderr)
+    return results
+
+
+#cases present in both runs whose throughput fell by more than tolerance
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    regressions = {}
+    for key, current in results.items():
+        if key not in baseline:
+            continue
+        ratio = current["path_steps_per_sec"] / baseline[key]["path_steps_per_sec"]
+        if ratio < 1 - tolerance:
+            regressions[key] = ratio
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput benchmark for the Monte Carlo engines")
+    parser.add_argument("--days", type=int, nargs="+", default=list(DEFAULT_DAYS))
+    parser.add_argument("--paths", type=int, nargs="+", default=list(DEFAULT_PATHS))
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), help="only run these cases")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--loop-max", dest="loop_max", type=int, default=LOOP_MAX,
+                        help="largest days x paths for the python loop engine")
+    parser.add_argument("--no-rss", dest="rss", action="store_false", help="skip the peak RSS subprocess runs")
+    parser.add_argument("--save", help="write the results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="JSON results to compare against, exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmarks(args.days, args.paths, args.cases, args.repeat, args.loop_max, args.rss)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+
+        #a slow window on a shared machine can still fail a case once, flagged cases are measured again
+        #and keep their best run, only a slowdown that persists is reported
+        for _ in range(CONFIRM_RUNS):
+            if not regressions:
+                break
+            for key in regressions:
+                name, days, paths = key.rsplit("/", 2)
+                rerun = measure(name, int(days), int(paths), args.repeat, rss=False)
+                if rerun["path_steps_per_sec"] > results[key]["path_steps_per_sec"]:
+                    results[key].update(rerun)
+            regressions = compare_to_baseline(results, baseline, args.tolerance)
+
+        for key, ratio in regressions.items():
+            print(f"REGRESSION {key}: {ratio:.0%} of baseline throughput", file=sys.stderr)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
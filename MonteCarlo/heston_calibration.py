@@ -0,0 +1,187 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+from scipy.optimize import minimize
+from MonteCarloHeston import load_numbers_from_file
+from parallel import run_shards
+
+#days per realized variance block
+DEFAULT_WINDOW = 5
+
+#the cache lives next to this module, not in whatever directory the run starts from
+DEFAULT_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "heston_calibration.json")
+
+DT = 1 / 365
+
+#order matches get_heston_parameters so the fit plugs straight into simulate_heston
+PARAM_NAMES = ("mu", "kappa", "theta", "xi", "rho")
+BOUNDS = ((-10.0, 10.0), (1e-2, 1e3), (1e-6, 50.0), (1e-3, 100.0), (-0.99, 0.99))
+
+#variance floor, a flat block would otherwise give a zero std in the likelihood
+MIN_VARIANCE = 1e-8
+
+
+#non-overlapping blocks of `window` daily log returns (the oldest leftover days are dropped):
+#block returns and the annualized realized variance of each block
+def realized_variance(prices, window=DEFAULT_WINDOW):
+    log_ret = np.diff(np.log(np.asarray(prices, dtype=float)))
+    n_blocks = log_ret.size // window
+    blocks = log_ret[log_ret.size - n_blocks * window:].reshape(n_blocks, window)
+    return blocks.sum(axis=1), np.maximum(np.mean(blocks ** 2, axis=1) / DT, MIN_VARIANCE)
+
+
+#stationary variance of v, the measurement noise of a realized variance block and how much
+#of the block's spread is signal (the errors-in-variables shrinkage towards theta)
+def _noise_model(kappa, theta, xi, window):
+    var_v = theta * xi ** 2 / (2 * kappa)
+    noise = 2 * (theta ** 2 + var_v) / window
+    return var_v, noise, var_v / (var_v + noise)
+
+
+#negative gaussian quasi log-likelihood of each block's (return, realized variance) pair given the previous
+#block, for all blocks at once. The realized variance is treated as the true variance plus sampling noise
+#(2 v^2 / window for gaussian returns), otherwise the noise is read as fast mean reversion and huge xi
+def negative_log_likelihood(x, block_ret, v_hat, window=DEFAULT_WINDOW):
+    mu, kappa, theta, xi, rho = x
+    h = window * DT
+    _, noise, shrink = _noise_model(kappa, theta, xi, window)
+    decay = np.exp(-kappa * h)
+
+    #filtered variance at the start of each block
+    v = np.maximum(theta + shrink * (v_hat[:-1] - theta), MIN_VARIANCE)
+    v_next = theta + decay * (v - theta)
+
+    var_ret = v * h
+    var_v = (xi ** 2 * v * (1 - decay ** 2) / (2 * kappa) + decay ** 2 * shrink * noise
+             + 2 * v_next ** 2 / window)
+    #the block return moves the variance that block's realized variance averages over
+    cov = rho * xi * v / kappa * (1 - (1 - decay) / (kappa * h))
+    det = var_ret * var_v - cov ** 2
+
+    a = block_ret[1:] - (mu - 0.5 * v) * h
+    b = v_hat[1:] - v_next
+    quad = (var_v * a ** 2 - 2 * cov * a * b + var_ret * b ** 2) / det
+    return float(np.mean(0.5 * np.log(det) + 0.5 * quad))
+
+
+#neutral start from the block moments, used when there is no previous fit to warm start from
+#(the moment heuristics of get_heston_parameters put kappa far out in the flat part of the likelihood)
+def _moment_start(block_ret, v_hat, window):
+    kappa = 1.0
+    theta = float(np.mean(v_hat))
+    var_v = max(float(np.var(v_hat)) - 2 * theta ** 2 / window, 0.1 * theta ** 2)
+    xi = np.sqrt(2 * kappa * var_v / theta)
+    rho = float(np.corrcoef(block_ret[1:], np.diff(v_hat))[0, 1])
+    mu = float(np.mean(block_ret)) / (window * DT) + 0.5 * theta
+    return [mu, kappa, theta, xi, rho]
+
+
+#quasi-MLE fit of one price series, warm_start is a previous fit (params dict) or None
+def calibrate_prices(prices, warm_start=None, window=DEFAULT_WINDOW):
+    block_ret, v_hat = realized_variance(prices, window)
+    if v_hat.size < 3:
+        raise ValueError(f"need at least {3 * window + 1} prices to calibrate")
+
+    x0 = _moment_start(block_ret, v_hat, window) if warm_start is None else [warm_start[n] for n in PARAM_NAMES]
+    x0 = [float(np.clip(value, low, high)) for value, (low, high) in zip(x0, BOUNDS)]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = minimize(negative_log_likelihood, x0, args=(block_ret, v_hat, window), method="L-BFGS-B",
+                          bounds=BOUNDS)
+
+    params = {name: float(value) for name, value in zip(PARAM_NAMES, result.x)}
+
+    #v0 is the filtered variance of the last block
+    _, _, shrink = _noise_model(params["kappa"], params["theta"], params["xi"], window)
+    params["v0"] = float(max(params["theta"] + shrink * (v_hat[-1] - params["theta"]), MIN_VARIANCE))
+    return {"params": params, "nll": float(result.fun), "iterations": int(result.nit),
+            "converged": bool(result.success)}
+
+
+#cache key: the price data and the settings that change the fit
+def data_key(prices, window=DEFAULT_WINDOW):
+    digest = hashlib.sha256(np.asarray(prices, dtype=float).tobytes())
+    digest.update(f"window={window}".encode())
+    return digest.hexdigest()
+
+
+#{"fits": {key: fit}, "latest": {path: key}}, latest gives the warm start when a file's data changes
+def load_cache(path):
+    if not path or not os.path.exists(path):
+        return {"fits": {}, "latest": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+#written to a temp file first so an interrupted run never leaves a half-written cache
+def save_cache(cache, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp, path)
+
+
+#process pool workers live at module level so they can be pickled
+def _calibrate_job(args):
+    prices, warm_start, window = args
+    return calibrate_prices(prices, warm_start, window)
+
+
+#fits every price file, unchanged data is served from the cache and only the rest is refit in the pool
+def calibrate_files(paths, cache_path=DEFAULT_CACHE, workers=None, window=DEFAULT_WINDOW):
+    cache = load_cache(cache_path)
+    results = {}
+    jobs = []
+
+    for path in paths:
+        prices = load_numbers_from_file(path)
+        if len(prices) < 3 * window + 1:
+            print(f"Skipping {path}: not enough prices", file=sys.stderr)
+            continue
+
+        key = data_key(prices, window)
+        if key in cache["fits"]:
+            results[path] = {**cache["fits"][key], "cached": True}
+            continue
+
+        previous = cache["fits"].get(cache["latest"].get(path))
+        jobs.append((path, key, (prices, previous["params"] if previous else None, window)))
+
+    fits = run_shards(_calibrate_job, [args for _, _, args in jobs], workers) if jobs else []
+    for (path, key, _), fit in zip(jobs, fits):
+        cache["fits"][key] = fit
+        cache["latest"][path] = key
+        results[path] = {**fit, "cached": False}
+
+    if cache_path and jobs:
+        save_cache(cache, cache_path)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Quasi-MLE Heston calibration over many price files")
+    parser.add_argument("files", nargs="+", help="price files, e.g. btc.csv")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="JSON cache of fitted parameters")
+    parser.add_argument("--workers", type=int, help="fit in this many processes (default: all cores)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="days per realized variance block")
+    parser.add_argument("--out", help="write the fits to this JSON file (default: print JSON)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = calibrate_files(args.files, args.cache, args.workers, args.window)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
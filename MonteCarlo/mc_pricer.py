@@ -0,0 +1,159 @@
+import numpy as np
+from MonteCarloGBM import vectorize_simulation
+from MonteCarloHeston import simulate_heston
+
+#paths are time x paths (the simulate_heston and path_store layout) and times[i] is the year fraction of row i
+
+#payoff matrices are built for this many (contract, path) pairs at a time
+DEFAULT_BLOCK = 4_000_000
+
+BARRIER_TYPES = ("up-and-out", "up-and-in", "down-and-out", "down-and-in")
+
+
+#risk-neutral GBM paths for pricing: daily drift r/365 - sigma_d^2 / 2 with sigma_d = sigma / sqrt(365)
+#row d is the price after d + 1 days, sigma and r are annual like in the Black-Scholes module
+def gbm_pricing_paths(s0, r, sigma, days, n_paths, rng=None, antithetic=False):
+    sigma_daily = sigma / np.sqrt(365)
+    mu_daily = r / 365 - 0.5 * sigma_daily ** 2
+    paths = vectorize_simulation(s0, days, n_paths, mu_daily, sigma_daily, rng, antithetic).T
+    return paths, np.arange(1, days + 1) / 365
+
+
+#risk-neutral Heston paths for pricing: the fitted drift is swapped for r, row 0 (s0) is dropped
+#so the first row is the first monitoring date like in gbm_pricing_paths
+def heston_pricing_paths(s0, params, r, days, n_paths, rng=None, antithetic=False, scheme="euler", step_days=1):
+    params = {**params, "mu": r}
+    S, _ = simulate_heston(s0, params, days + 1, n_paths, rng=rng, antithetic=antithetic, scheme=scheme,
+                           step_days=step_days)
+    times = np.arange(1, S.shape[0]) / 365 * step_days
+    times[-1] = days / 365
+    return S[1:], times
+
+
+#row of the path set nearest to each expiry, expiries between simulated dates snap to the closer one
+#(T = 0.25 lands on day 91). expiries before the first date or past the last by more than half a step are rejected
+def _expiry_rows(times, T):
+    last_step = times[-1] - times[-2] if times.size > 1 else times[-1]
+    if np.any(T <= 0) or np.any(T > times[-1] + 0.5 * last_step + 1e-12):
+        raise ValueError(f"expiries must lie in (0, {times[-1]:.6g}] years, the simulated horizon")
+    upper = np.clip(np.searchsorted(times, T), 1, times.size - 1) if times.size > 1 else np.zeros(T.size, int)
+    lower = np.maximum(upper - 1, 0)
+    return np.where(np.abs(times[lower] - T) <= np.abs(times[upper] - T), lower, upper)
+
+
+#the quantity the payoff is written on, at every row: the price, its running average (asian)
+#or the price together with its running max / min (barrier)
+def _underlying(paths, payoff, barrier_type):
+    if payoff == "european":
+        return paths, None
+    if payoff == "asian":
+        return np.cumsum(paths, axis=0) / np.arange(1, paths.shape[0] + 1)[:, None], None
+    if payoff == "barrier":
+        if barrier_type not in BARRIER_TYPES:
+            raise ValueError(f"barrier_type must be one of {BARRIER_TYPES}")
+        accumulate = np.maximum if barrier_type.startswith("up") else np.minimum
+        return paths, accumulate.accumulate(paths, axis=0)
+    raise ValueError("payoff must be 'european', 'asian' or 'barrier'")
+
+
+#mean and standard error of every row, antithetic pairs (neighbouring paths) are averaged first
+def _row_mean_with_se(values, antithetic):
+    if antithetic:
+        values = values.reshape(values.shape[0], -1, 2).mean(axis=2)
+    n = values.shape[1]
+    return values.mean(axis=1), values.std(axis=1, ddof=1) / np.sqrt(n)
+
+
+#discounted payoffs of a block of contracts (rows) over every path (columns)
+def _discounted_payoffs(level, extreme, K, is_call, barrier, barrier_type, discount):
+    intrinsic = np.where(is_call[:, None], level - K[:, None], K[:, None] - level)
+    np.maximum(intrinsic, 0, out=intrinsic)
+
+    if extreme is not None:
+        if barrier_type == "up-and-out":
+            alive = extreme < barrier[:, None]
+        elif barrier_type == "up-and-in":
+            alive = extreme >= barrier[:, None]
+        elif barrier_type == "down-and-out":
+            alive = extreme > barrier[:, None]
+        else:
+            alive = extreme <= barrier[:, None]
+        intrinsic *= alive
+
+    intrinsic *= discount[:, None]
+    return intrinsic
+
+
+#prices every contract of a chain off one shared path set, returns {"price", "se", "T"} shaped like the
+#broadcast inputs (T is the expiry after snapping to the simulated dates).
+#K, T (years), r, is_call and barrier broadcast against each other like price_chain.
+#with s0 given the discounted price at expiry (whose mean is s0) is used as a control variate
+def price_options(paths, times, K, T, r, payoff="european", is_call=True, barrier=None,
+                  barrier_type="down-and-out", antithetic=False, s0=None, block=DEFAULT_BLOCK):
+    paths = np.asarray(paths, dtype=float)
+    times = np.asarray(times, dtype=float)
+    if barrier is None and payoff == "barrier":
+        raise ValueError("barrier payoffs need a barrier level")
+
+    K, T, r, is_call, barrier = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+                                                     np.asarray(r, dtype=float), np.asarray(is_call, dtype=bool),
+                                                     np.asarray(np.nan if barrier is None else barrier, dtype=float))
+    shape = K.shape
+    K, T, r, is_call, barrier = (x.ravel() for x in (K, T, r, is_call, barrier))
+
+    #expiries snap to the simulated dates, the snapped T is what gets discounted and reported
+    rows = _expiry_rows(times, T)
+    T = times[rows]
+    discount = np.exp(-r * T)
+
+    #expiries index into the rows of the path set, each row is gathered once
+    expiry_rows, row_index = np.unique(rows, return_inverse=True)
+    underlying, running = _underlying(paths, payoff, barrier_type)
+    underlying = underlying[expiry_rows]
+    running = None if running is None else running[expiry_rows]
+    terminal = paths[expiry_rows]
+
+    price = np.empty(K.size)
+    se = np.empty(K.size)
+    step = max(1, block // paths.shape[1])
+    for start in range(0, K.size, step):
+        idx = slice(start, start + step)
+        rows = row_index[idx]
+        y = _discounted_payoffs(underlying[rows], None if running is None else running[rows], K[idx],
+                                is_call[idx], barrier[idx], barrier_type, discount[idx])
+
+        if s0 is not None:
+            #per contract beta of the payoff on the discounted price, whose expectation is known
+            x = terminal[rows] * discount[idx, None]
+            x_centered = x - x.mean(axis=1, keepdims=True)
+            var_x = np.einsum("ij,ij->i", x_centered, x_centered)
+            beta = np.einsum("ij,ij->i", y - y.mean(axis=1, keepdims=True), x_centered)
+            beta = np.divide(beta, var_x, out=np.zeros_like(beta), where=var_x > 0)
+            y -= beta[:, None] * (x - s0)
+
+        price[idx], se[idx] = _row_mean_with_se(y, antithetic)
+
+    return {"price": price.reshape(shape), "se": se.reshape(shape), "T": T.reshape(shape)}
+
+
+#days to simulate so the longest expiry (years) is on the grid
+def _days_needed(T):
+    return int(np.ceil(np.max(T) * 365 - 1e-9))
+
+
+#one GBM simulation out to the longest expiry, priced for the whole chain
+def gbm_option_chain(s0, K, T, r, sigma, n_paths, payoff="european", is_call=True, barrier=None,
+                     barrier_type="down-and-out", rng=None, antithetic=False, control_variate=True):
+    paths, times = gbm_pricing_paths(s0, r, sigma, _days_needed(T), n_paths, rng, antithetic)
+    return price_options(paths, times, K, T, r, payoff, is_call, barrier, barrier_type, antithetic,
+                         s0 if control_variate else None)
+
+
+#one Heston simulation out to the longest expiry, priced for the whole chain
+def heston_option_chain(s0, params, K, T, r, n_paths, payoff="european", is_call=True, barrier=None,
+                        barrier_type="down-and-out", rng=None, antithetic=False, control_variate=True,
+                        scheme="euler", step_days=1):
+    paths, times = heston_pricing_paths(s0, params, r, _days_needed(T), n_paths, rng, antithetic, scheme,
+                                        step_days)
+    return price_options(paths, times, K, T, r, payoff, is_call, barrier, barrier_type, antithetic,
+                         s0 if control_variate else None)
@@ -0,0 +1,170 @@
+import argparse
+import contextlib
+import json
+import sys
+
+import numpy as np
+from MonteCarloGBM import load_numbers_from_file
+from MonteCarloHeston import HESTON_SCHEMES, get_heston_parameters, heston_time_steps
+from variance_reduction import summarize_terminal
+
+#paths simulated per chunk, a chunk holds chunk_size x n_assets prices
+DEFAULT_CHUNK = 10_000
+
+#diagonal jitter tried when the sample covariance is not positive definite (more assets than days)
+CHOLESKY_JITTER = (0.0, 1e-12, 1e-10, 1e-8, 1e-6)
+
+
+#price files have no dates, so they are assumed to end on the same day and only the common tail is kept
+def load_aligned_prices(paths):
+    series = [load_numbers_from_file(path) for path in paths]
+    for path, prices in zip(paths, series):
+        if len(prices) < 2:
+            raise ValueError(f"No prices loaded from {path}")
+    length = min(len(prices) for prices in series)
+    return np.column_stack([prices[-length:] for prices in series])
+
+
+#daily drift and covariance of the log returns, days x assets in, the drift is corrected by
+#-sigma^2 / 2 per asset like calc_sigma_and_mu_daily
+def estimate_drift_and_covariance(prices):
+    log_ret = np.diff(np.log(prices), axis=0)
+    cov = np.atleast_2d(np.cov(log_ret, rowvar=False, ddof=1))
+    return np.mean(log_ret, axis=0) - 0.5 * np.diag(cov), cov
+
+
+#lower Cholesky factor, a little jitter on the diagonal only if the matrix is singular
+def cholesky_factor(cov):
+    scale = np.mean(np.diag(cov))
+    for jitter in CHOLESKY_JITTER:
+        try:
+            return np.linalg.cholesky(cov + jitter * scale * np.eye(cov.shape[0]))
+        except np.linalg.LinAlgError:
+            continue
+    raise ValueError("covariance matrix is not positive semi-definite")
+
+
+#iid normals (..., n_assets) turned into correlated shocks with one matmul against the Cholesky factor
+def correlate(z, L):
+    return z @ L.T
+
+
+#portfolio value at the horizon for every path: each asset's log return over `days` is exactly
+#N(days * mu, days * cov), so one correlated draw per asset and path is enough.
+#weights are fractions of the starting value in each asset, chunks keep memory at chunk_size x n_assets
+def gbm_portfolio_values(days, n_paths, mu, L, weights, value=1.0, chunk_size=DEFAULT_CHUNK, rng=None):
+    rng = np.random if rng is None else rng
+    weights = np.asarray(weights, dtype=float)
+    ending = np.empty(n_paths)
+    for start in range(0, n_paths, chunk_size):
+        n = min(chunk_size, n_paths - start)
+        log_ret = days * mu + np.sqrt(days) * correlate(rng.normal(0, 1, (n, L.shape[0])), L)
+        ending[start:start + n] = value * (np.exp(log_ret) @ weights)
+    return ending
+
+
+#Heston parameters of each asset as arrays, they broadcast over a (paths, assets) state
+def heston_parameter_arrays(prices):
+    fits = [get_heston_parameters(prices[:, i]) for i in range(prices.shape[1])]
+    return {name: np.array([fit[name] for fit in fits]) for name in fits[0]}
+
+
+#correlation of the daily log returns, the cross-asset part of the Heston price shocks
+def return_correlation(prices):
+    return np.atleast_2d(np.corrcoef(np.diff(np.log(prices), axis=0), rowvar=False))
+
+
+#every asset follows its own Heston model, all assets step together as one (paths, assets) array.
+#the price shocks are correlated across assets through L (a correlation Cholesky factor),
+#each variance keeps its own rho to its price and is otherwise independent
+#euler takes the price shock as w1, qe as w2 (w1 drives its variance sampler)
+#days counts the starting day like simulate_heston
+def heston_portfolio_values(days, n_paths, params, L, weights, value=1.0, chunk_size=DEFAULT_CHUNK, rng=None,
+                            scheme="euler", step_days=1):
+    rng = np.random if rng is None else rng
+    step = HESTON_SCHEMES[scheme]
+    dts = heston_time_steps(days, step_days)
+    mu, kappa, theta, xi, rho = (params[name] for name in ("mu", "kappa", "theta", "xi", "rho"))
+    weights = np.asarray(weights, dtype=float)
+    n_assets = L.shape[0]
+
+    ending = np.empty(n_paths)
+    for start in range(0, n_paths, chunk_size):
+        n = min(chunk_size, n_paths - start)
+
+        #prices relative to their start, so the weights are value fractions
+        S = np.ones((n, n_assets))
+        V = np.broadcast_to(params["v0"], (n, n_assets)).copy()
+        for dt in dts:
+            price_shock = correlate(rng.normal(0, 1, (n, n_assets)), L)
+            other = rng.normal(0, 1, (n, n_assets))
+            if scheme == "qe":
+                S, V = step(S, V, other, price_shock, mu, kappa, theta, xi, rho, dt)
+            else:
+                S, V = step(S, V, price_shock, other, mu, kappa, theta, xi, rho, dt)
+        ending[start:start + n] = value * (S @ weights)
+    return ending
+
+
+#portfolio level mean, probability of profit, VaR and CVaR (with standard errors where available)
+def summarize_portfolio(ending_values, value=1.0):
+    stats = summarize_terminal(ending_values, value)
+    stats["var_5_loss"] = value - stats["var_5"]
+    stats["cvar_5_loss"] = value - stats["cvar_5"]
+    return stats
+
+
+def run_portfolio(files, days, reps, weights=None, value=1.0, model="gbm", seed=None, chunk_size=DEFAULT_CHUNK,
+                  scheme="euler", step_days=1):
+    prices = load_aligned_prices(files)
+    weights = np.full(len(files), 1 / len(files)) if weights is None else np.asarray(weights, dtype=float)
+    if weights.size != len(files):
+        raise ValueError("need one weight per price file")
+    rng = np.random.default_rng(seed)
+
+    if model == "gbm":
+        mu, cov = estimate_drift_and_covariance(prices)
+        ending = gbm_portfolio_values(days, reps, mu, cholesky_factor(cov), weights, value, chunk_size, rng)
+    elif model == "heston":
+        params = heston_parameter_arrays(prices)
+        L = cholesky_factor(return_correlation(prices))
+        ending = heston_portfolio_values(days + 1, reps, params, L, weights, value, chunk_size, rng, scheme,
+                                         step_days)
+    else:
+        raise ValueError("model must be 'gbm' or 'heston'")
+
+    return {"model": model, "assets": list(files), "weights": weights.tolist(), "days": days, "reps": reps,
+            "history_days": int(prices.shape[0]), "value": value, **summarize_portfolio(ending, value)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Correlated multi-asset portfolio simulator")
+    parser.add_argument("files", nargs="+", help="price files, assumed to end on the same day")
+    parser.add_argument("--days", type=int, required=True, help="number of days to simulate")
+    parser.add_argument("--reps", type=int, required=True, help="number of simulations")
+    parser.add_argument("--weights", type=float, nargs="+", help="value fraction per file (default: equal)")
+    parser.add_argument("--value", type=float, default=1.0, help="starting portfolio value")
+    parser.add_argument("--model", choices=["gbm", "heston"], default="gbm")
+    parser.add_argument("--scheme", choices=list(HESTON_SCHEMES), default="euler", help="Heston discretization")
+    parser.add_argument("--step-days", dest="step_days", type=int, default=1, help="days per Heston time step")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible runs")
+    parser.add_argument("--chunk-size", dest="chunk_size", type=int, default=DEFAULT_CHUNK, help="paths per chunk")
+    parser.add_argument("--out", help="write results to this JSON file (default: print JSON)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    #keep stdout clean for the JSON result
+    with contextlib.redirect_stdout(sys.stderr):
+        result = run_portfolio(args.files, args.days, args.reps, args.weights, args.value, args.model, args.seed,
+                               args.chunk_size, args.scheme, args.step_days)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import concurrent.futures
+import os
+
+import numpy as np
+from MonteCarloGBM import simulate_ending_prices, simulate_terminal_stats
+from MonteCarloHeston import simulate_heston_streaming, simulate_heston_terminal_stats
+
+#paths are always cut into this many shards, whatever the worker count,
+#so each shard draws from the same SeedSequence child and the output is bit-identical
+DEFAULT_SHARDS = 64
+
+
+#path counts per shard, the remainder goes to the first shards
+#antithetic shards hand out whole (z, -z) pairs so no pair is split across shards
+def shard_sizes(n_paths, n_shards=DEFAULT_SHARDS, antithetic=False):
+    unit = 2 if antithetic else 1
+    base, extra = divmod(-(-n_paths // unit), n_shards)
+    return [(base + (i < extra)) * unit for i in range(n_shards)]
+
+
+#shard workers live at module level so the process pool can pickle them
+def _gbm_shard(args):
+    s0, days, n_paths, mu, sigma, antithetic, dtype, seed_seq = args
+    return simulate_ending_prices(s0, days, n_paths, mu, sigma, rng=np.random.default_rng(seed_seq),
+                                  antithetic=antithetic, dtype=dtype)
+
+
+def _heston_shard(args):
+    s0, params, days, n_paths, antithetic, scheme, step_days, dtype, seed_seq = args
+    return simulate_heston_streaming(s0, params, days, n_paths, rng=np.random.default_rng(seed_seq),
+                                     antithetic=antithetic, scheme=scheme, step_days=step_days, dtype=dtype)["S"]
+
+
+#sketch shards return a TerminalStats, only a few KB travel back instead of the ending prices
+def _gbm_stats_shard(args):
+    s0, days, n_paths, mu, sigma, antithetic, dtype, seed_seq = args
+    return simulate_terminal_stats(s0, days, n_paths, mu, sigma, rng=np.random.default_rng(seed_seq),
+                                   antithetic=antithetic, dtype=dtype)
+
+
+def _heston_stats_shard(args):
+    s0, params, days, n_paths, antithetic, scheme, step_days, dtype, seed_seq = args
+    return simulate_heston_terminal_stats(s0, params, days, n_paths, rng=np.random.default_rng(seed_seq),
+                                          antithetic=antithetic, scheme=scheme, step_days=step_days, dtype=dtype)
+
+
+#results come back in shard order no matter which worker finished first
+def run_shards(shard_fn, shard_args, workers=None):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [shard_fn(args) for args in shard_args]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(shard_fn, shard_args))
+
+
+def gbm_ending_prices_parallel(s0, days, n_paths, mu, sigma, seed=0, workers=None, n_shards=DEFAULT_SHARDS,
+                               antithetic=False, dtype=np.float64):
+    streams = np.random.SeedSequence(seed).spawn(n_shards)
+    sizes = shard_sizes(n_paths, n_shards, antithetic)
+    shard_args = [(s0, days, n, mu, sigma, antithetic, dtype, stream) for n, stream in zip(sizes, streams)]
+    return np.concatenate(run_shards(_gbm_shard, shard_args, workers))
+
+
+def heston_ending_prices_parallel(s0, params, days, n_paths, seed=0, workers=None, n_shards=DEFAULT_SHARDS,
+                                  antithetic=False, scheme="euler", step_days=1, dtype=np.float64):
+    streams = np.random.SeedSequence(seed).spawn(n_shards)
+    sizes = shard_sizes(n_paths, n_shards, antithetic)
+    shard_args = [(s0, params, days, n, antithetic, scheme, step_days, dtype, stream)
+                  for n, stream in zip(sizes, streams)]
+    return np.concatenate(run_shards(_heston_shard, shard_args, workers))
+
+
+#shard stats are merged in shard order, so the merged sketch is reproducible too
+def _merge_stats(shard_stats):
+    merged = shard_stats[0]
+    for stats in shard_stats[1:]:
+        merged.merge(stats)
+    return merged
+
+
+def gbm_terminal_stats_parallel(s0, days, n_paths, mu, sigma, seed=0, workers=None, n_shards=DEFAULT_SHARDS,
+                                antithetic=False, dtype=np.float64):
+    streams = np.random.SeedSequence(seed).spawn(n_shards)
+    sizes = shard_sizes(n_paths, n_shards, antithetic)
+    shard_args = [(s0, days, n, mu, sigma, antithetic, dtype, stream) for n, stream in zip(sizes, streams)]
+    return _merge_stats(run_shards(_gbm_stats_shard, shard_args, workers))
+
+
+def heston_terminal_stats_parallel(s0, params, days, n_paths, seed=0, workers=None, n_shards=DEFAULT_SHARDS,
+                                   antithetic=False, scheme="euler", step_days=1, dtype=np.float64):
+    streams = np.random.SeedSequence(seed).spawn(n_shards)
+    sizes = shard_sizes(n_paths, n_shards, antithetic)
+    shard_args = [(s0, params, days, n, antithetic, scheme, step_days, dtype, stream)
+                  for n, stream in zip(sizes, streams)]
+    return _merge_stats(run_shards(_heston_stats_shard, shard_args, workers))
+
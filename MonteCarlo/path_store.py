@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from MonteCarloGBM import vectorize_simulation
+from MonteCarloHeston import heston_time_steps, simulate_heston
+
+#a store is a directory with paths.npy (time x paths, so one horizon is a contiguous row) and meta.json
+PATHS_FILE = "paths.npy"
+META_FILE = "meta.json"
+
+#paths simulated and written per chunk, only one chunk is ever held in RAM
+DEFAULT_CHUNK = 10_000
+
+
+#generate(rng, n) returns a (time, n) block of paths, blocks are written straight into the memmap
+#chunk k draws from its own SeedSequence child, so the store only depends on seed and chunk_size
+def write_store(directory, generate, n_paths, n_rows, meta, seed=0, chunk_size=DEFAULT_CHUNK, dtype=np.float64):
+    os.makedirs(directory, exist_ok=True)
+    paths = open_memmap(os.path.join(directory, PATHS_FILE), mode="w+", dtype=dtype, shape=(n_rows, n_paths))
+
+    n_chunks = -(-n_paths // chunk_size)
+    streams = np.random.SeedSequence(seed).spawn(n_chunks)
+    for start, stream in zip(range(0, n_paths, chunk_size), streams):
+        stop = min(start + chunk_size, n_paths)
+        paths[:, start:stop] = generate(np.random.default_rng(stream), stop - start)
+    paths.flush()
+
+    meta = {**meta, "n_paths": n_paths, "n_rows": n_rows, "seed": seed, "chunk_size": chunk_size,
+            "dtype": np.dtype(dtype).name}
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+    del paths
+    return open_store(directory)
+
+
+#read-only memmap and metadata, slices like paths[row] or paths[:, :10] read only those pages
+def open_store(directory):
+    with open(os.path.join(directory, META_FILE), "r") as f:
+        meta = json.load(f)
+    return np.load(os.path.join(directory, PATHS_FILE), mmap_mode="r"), meta
+
+
+#row of the store for a day ahead, rows sit on the days listed in meta["days"]
+def row_for_day(meta, day):
+    days = meta["days"]
+    if day not in days:
+        raise ValueError(f"day {day} is not on the stored grid, stored days run {days[0]}..{days[-1]}")
+    return days.index(day)
+
+
+#GBM paths as vectorize_simulation makes them, row d holds the price after d + 1 days
+def store_gbm_paths(directory, s0, days, reps, mu, sigma, seed=0, chunk_size=DEFAULT_CHUNK, antithetic=False,
+                    dtype=np.float64):
+    if antithetic:
+        reps += reps % 2
+        chunk_size += chunk_size % 2
+
+    def generate(rng, n):
+        return vectorize_simulation(s0, days, n, mu, sigma, rng=rng, antithetic=antithetic, dtype=dtype).T
+
+    meta = {"model": "gbm", "s0": float(s0), "mu_daily": float(mu), "sigma_daily": float(sigma),
+            "antithetic": antithetic, "days": list(range(1, days + 1))}
+    return write_store(directory, generate, reps, days, meta, seed, chunk_size, dtype)
+
+
+#Heston paths as simulate_heston makes them, row 0 is s0 and rows are step_days apart
+def store_heston_paths(directory, s0, params, days, reps, seed=0, chunk_size=DEFAULT_CHUNK, antithetic=False,
+                       scheme="euler", step_days=1, dtype=np.float64):
+    if antithetic:
+        reps += reps % 2
+        chunk_size += chunk_size % 2
+
+    def generate(rng, n):
+        return simulate_heston(s0, params, days, n, rng=rng, antithetic=antithetic, scheme=scheme,
+                               step_days=step_days, dtype=dtype)[0]
+
+    grid = np.concatenate(([0.0], np.cumsum(heston_time_steps(days, step_days)) * 365))
+    meta = {"model": "heston", "s0": float(s0), "params": {name: float(value) for name, value in params.items()},
+            "antithetic": antithetic, "scheme": scheme, "step_days": step_days,
+            "days": [int(round(day)) for day in grid]}
+    return write_store(directory, generate, reps, len(grid), meta, seed, chunk_size, dtype)
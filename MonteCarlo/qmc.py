@@ -0,0 +1,98 @@
+import numpy as np
+
+#scipy.stats.qmc is imported inside sobol_normals so plain pseudo-random runs never pay for it
+
+
+#order in which the bridge fills the time grid 1..n_steps: terminal point first, then midpoints
+#each entry is (t, left, right), W_left and W_right are already known when W_t is drawn
+def _bridge_plan(n_steps):
+    plan = [(n_steps, 0, None)]
+    intervals = [(0, n_steps)]
+    while intervals:
+        next_intervals = []
+        for left, right in intervals:
+            if right - left < 2:
+                continue
+            mid = (left + right) // 2
+            plan.append((mid, left, right))
+            next_intervals += [(left, mid), (mid, right)]
+        intervals = next_intervals
+    return plan
+
+
+#turn iid normals z (paths x steps) into Brownian increments built by a Brownian bridge
+#column 0 of z sets the terminal value, so the first (best distributed) Sobol dims carry the most variance
+def brownian_bridge_increments(z):
+    n_paths, n_steps = z.shape
+    W = np.zeros((n_paths, n_steps + 1))
+
+    for column, (t, left, right) in enumerate(_bridge_plan(n_steps)):
+        if right is None:
+            W[:, t] = np.sqrt(t) * z[:, column]
+            continue
+        w_left = (right - t) / (right - left)
+        w_right = (t - left) / (right - left)
+        std = np.sqrt((t - left) * (right - t) / (right - left))
+        W[:, t] = w_left * W[:, left] + w_right * W[:, right] + std * z[:, column]
+
+    return np.diff(W, axis=1)
+
+
+#scramble seed from a Generator, or from the global np.random state so np.random.seed still applies
+def _scramble_seed(rng):
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.randint(0, 2 ** 31 - 1)
+
+
+#scrambled Sobol standard normals, shape (n_factors, n_paths, n_steps)
+#factors take interleaved dimensions so each Brownian motion gets its share of the leading dims
+#n_paths should be a power of 2 to keep the Sobol balance properties
+def sobol_normals(n_paths, n_steps, rng=None, bridge=True, n_factors=1):
+    from scipy.stats import qmc
+    from scipy.special import ndtri
+
+    rng = np.random if rng is None else rng
+    sampler = qmc.Sobol(d=n_steps * n_factors, scramble=True, seed=_scramble_seed(rng))
+    u = sampler.random(n_paths)
+
+    #keep the inverse cdf finite
+    z = ndtri(np.clip(u, 1e-12, 1 - 1e-12))
+
+    factors = [z[:, f::n_factors] for f in range(n_factors)]
+    if bridge:
+        factors = [brownian_bridge_increments(factor) for factor in factors]
+    return np.stack(factors)
+
+
+#randomized QMC: run(rng) returns a dict of statistics from one independently scrambled replicate,
+#the spread across replicates gives the standard error
+def rqmc_replicates(run, n_replicates=16, seed=0):
+    streams = np.random.SeedSequence(seed).spawn(n_replicates)
+    results = [run(np.random.default_rng(stream)) for stream in streams]
+
+    summary = {}
+    for name in results[0]:
+        values = np.array([r[name] for r in results], dtype=float)
+        summary[name] = float(np.mean(values))
+        summary[f"{name}_se"] = float(np.std(values, ddof=1) / np.sqrt(n_replicates))
+    return summary
+
+
+#run_batch options the RQMC branch does not implement, they raise instead of being silently dropped
+SOBOL_UNSUPPORTED = ("antithetic", "plot", "sketch", "store", "workers")
+
+
+#paths per scrambled replicate, every replicate gets the same count so only whole multiples are simulated
+def rqmc_paths_per_replicate(config, reps, n_replicates):
+    used = [name for name in SOBOL_UNSUPPORTED if config.get(name)]
+    dtype = np.dtype(config.get("dtype") or "float64")
+    if dtype != np.float64:
+        used.append(f"dtype {dtype.name}")
+    if used:
+        raise ValueError(f"the sobol sampler does not support {', '.join(used)}")
+    if n_replicates < 2:
+        raise ValueError("the sobol sampler needs at least 2 replicates for the standard error")
+    if reps < n_replicates:
+        raise ValueError(f"reps ({reps}) must be at least the number of sobol replicates ({n_replicates})")
+    return reps // n_replicates
@@ -0,0 +1,177 @@
+import numpy as np
+
+#KLL capacity decay between levels, the top level holds k items
+CAPACITY_DECAY = 2 / 3
+MIN_CAPACITY = 8
+
+#95% two sided normal quantile for the confidence intervals
+Z_95 = 1.959963984540054
+
+
+#mergeable KLL quantile sketch: level i holds sorted-and-halved samples that each stand for 2**i values
+#memory is O(k) items no matter how many values go in, rank error is roughly O(1/k)
+class QuantileSketch:
+    def __init__(self, k=2048, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(MIN_CAPACITY, int(np.ceil(self.k * CAPACITY_DECAY ** depth)))
+
+    #sort an overfull level and promote every other item (random offset) to the level above
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+
+                #an odd item out stays behind so the promoted half is exact
+                leftover = items[:items.size % 2]
+                items = items[items.size % 2:]
+                promoted = items[self._rng.integers(2)::2]
+
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+                self.levels[level] = leftover
+            level += 1
+
+    def update(self, values):
+        values = np.ravel(np.asarray(values, dtype=float))
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self.count += values.size
+        self._compress()
+
+    #levels are added together, so per-shard sketches combine into one
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _sorted_items(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(items.size, 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values)
+        return values[order], weights[order]
+
+    def quantile(self, q):
+        values, weights = self._sorted_items()
+        cumulative = np.cumsum(weights)
+        index = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side='left')
+        return values[np.minimum(index, values.size - 1)]
+
+    #items and their weight inside the lowest q fraction, the item that straddles the cutoff
+    #only counts with its share of weight
+    def _tail(self, q):
+        values, weights = self._sorted_items()
+        cutoff = q * np.sum(weights)
+        before = np.cumsum(weights) - weights
+        return values, np.clip(cutoff - before, 0, weights), cutoff
+
+    #mean of the lowest q fraction (expected shortfall below the q quantile)
+    def tail_mean(self, q):
+        values, in_tail, cutoff = self._tail(q)
+        return float(np.dot(values, in_tail) / cutoff)
+
+    #variance of the values inside the lowest q fraction
+    def tail_variance(self, q):
+        values, in_tail, cutoff = self._tail(q)
+        mean = np.dot(values, in_tail) / cutoff
+        return float(np.dot((values - mean) ** 2, in_tail) / cutoff)
+
+    def nbytes(self):
+        return sum(items.nbytes for items in self.levels)
+
+
+#sketch compaction seed drawn from the same random source as the paths,
+#a Generator or the global np.random state so np.random.seed still applies
+def sketch_seed(rng):
+    if isinstance(rng, np.random.Generator):
+        return int(rng.integers(2 ** 63))
+    return np.random.randint(0, 2 ** 31 - 1)
+
+
+#distribution-free 95% interval of the q quantile: the order statistics whose ranks sit
+#Z_95 binomial standard errors either side of n * q, read from the sketch
+def quantile_interval(sketch, q, n):
+    half = Z_95 * np.sqrt(q * (1 - q) / n)
+    low, high = sketch.quantile([max(q - half, 0.0), min(q + half, 1.0)])
+    return float(low), float(high)
+
+
+#count, mean and sum of squared deviations of two accumulators combined (Chan et al.), so chunk
+#and shard moments merge without the cancellation of a raw sum of squares
+def _combine_moments(a, b):
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if n == 0:
+        return a
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta ** 2 * n_a * n_b / n
+
+
+#running count, moments of the price and of the profit indicator, plus the sketch for VaR / CVaR
+#updated one chunk of ending prices at a time, and shard accumulators merge.
+#with antithetic=True chunks hold whole (z, -z) pairs and the moments are taken over the pair means
+class TerminalStats:
+    def __init__(self, s0, k=2048, seed=0, antithetic=False):
+        self.s0 = s0
+        self.antithetic = antithetic
+        self.count = 0
+        self.n_profit = 0
+        self.moments = (0, np.zeros(2), np.zeros(2))
+        self.sketch = QuantileSketch(k, seed)
+
+    def update(self, ending_prices):
+        ending_prices = np.ravel(np.asarray(ending_prices, dtype=float))
+        profit = ending_prices > self.s0
+        self.count += ending_prices.size
+        self.n_profit += int(np.sum(profit))
+        self.sketch.update(ending_prices)
+
+        samples = np.column_stack((ending_prices, profit))
+        if self.antithetic:
+            samples = samples.reshape(-1, 2, 2).mean(axis=1)
+        mean = samples.mean(axis=0)
+        self.moments = _combine_moments(self.moments, (samples.shape[0], mean, np.sum((samples - mean) ** 2, axis=0)))
+
+    def merge(self, other):
+        self.count += other.count
+        self.n_profit += other.n_profit
+        self.moments = _combine_moments(self.moments, other.moments)
+        self.sketch.merge(other.sketch)
+        return self
+
+    #statistics with standard errors: the mean and probability of profit from the running moments,
+    #VaR from the order-statistic interval (its 95% half-width / Z_95) and CVaR from the variance of
+    #(X - VaR) 1{X <= VaR} / level, computed from the sketch items in the tail
+    def summary(self, level=0.05):
+        n_samples, mean, m2 = self.moments
+        se = np.sqrt(m2 / max(n_samples - 1, 1) / n_samples)
+
+        var = float(self.sketch.quantile(level))
+        var_low, var_high = quantile_interval(self.sketch, level, self.count)
+        cvar = self.sketch.tail_mean(level)
+        gap = cvar - var
+        tail_spread = level * (self.sketch.tail_variance(level) + gap ** 2) - (level * gap) ** 2
+
+        return {
+            "n_paths": self.count,
+            "mean_price": float(mean[0]),
+            "mean_price_se": float(se[0]),
+            "prob_profit": self.n_profit / self.count * 100,
+            "prob_profit_se": float(se[1] * 100),
+            "var_5": var,
+            "var_5_se": (var_high - var_low) / (2 * Z_95),
+            "cvar_5": cvar,
+            "cvar_5_se": float(np.sqrt(max(tail_spread, 0.0) / self.count) / level),
+        }
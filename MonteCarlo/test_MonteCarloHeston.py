@@ -0,0 +1,32 @@
+import numpy as np
+from MonteCarloHeston import heston_qe_step, simulate_heston_streaming
+from variance_reduction import summarize_terminal
+
+PARAMS = {"mu": 0.05, "kappa": 2.0, "theta": 0.04, "xi": 0.9, "rho": -0.7, "v0": 1e-4}
+
+
+def test_qe_step_float32_large_shocks_are_finite():
+    #low variance puts every path in the exponential branch, w1 past 5.3 used to give 1 - Phi(w1) = 0
+    n = 6
+    S = np.full(n, 100, np.float32)
+    V = np.full(n, 1e-4, np.float32)
+    w1 = np.array([0, 3, 5.5, 7, 9, 12], np.float32)
+    S_next, V_next = heston_qe_step(S, V, w1, np.zeros(n, np.float32), 0.05, 2.0, 0.04, 0.9, -0.7, 7 / 365)
+    assert np.all(np.isfinite(S_next))
+    assert np.all(np.isfinite(V_next))
+
+    #float32 and float64 steps agree on the same shocks
+    S64, V64 = heston_qe_step(S.astype(float), V.astype(float), w1.astype(float), np.zeros(n), 0.05, 2.0, 0.04,
+                              0.9, -0.7, 7 / 365)
+    np.testing.assert_allclose(V_next, V64, rtol=1e-4, atol=1e-7)
+    np.testing.assert_allclose(S_next, S64, rtol=1e-4)
+
+
+def test_qe_float32_weekly_paths_summary_is_finite():
+    result = simulate_heston_streaming(100.0, PARAMS, 366, 50_000, rng=np.random.default_rng(0), scheme="qe",
+                                       step_days=7, dtype=np.float32)
+    for name in ("S", "V", "max", "min", "mean"):
+        assert np.all(np.isfinite(result[name])), name
+
+    stats = summarize_terminal(result["S"], 100.0)
+    assert all(np.isfinite(value) for value in stats.values())
@@ -0,0 +1,129 @@
+import numpy as np
+
+#batches used for the batch-means standard error of quantiles
+N_BATCHES = 20
+
+
+#float64 draws per chunk when the global np.random state fills a narrower buffer
+LEGACY_CHUNK = 1 << 16
+
+
+#a Generator draws float32 directly. the global np.random module (or a RandomState) only makes float64,
+#so a float32 buffer is filled LEGACY_CHUNK draws at a time, the full float64 matrix never exists.
+#the legacy stream is sequential, so the values are the same as one big draw cast down
+def standard_normal(rng, shape, dtype=np.float64):
+    if isinstance(rng, np.random.Generator):
+        return rng.standard_normal(shape, dtype=dtype)
+    if np.dtype(dtype) == np.float64:
+        return rng.normal(0, 1, shape)
+
+    out = np.empty(shape, dtype)
+    flat = out.reshape(-1)
+    for start in range(0, flat.size, LEGACY_CHUNK):
+        stop = min(start + LEGACY_CHUNK, flat.size)
+        flat[start:stop] = rng.normal(0, 1, stop - start)
+    return out
+
+
+#standard normals, with antithetic=True every draw z is followed by -z along `axis`
+#so pairs sit next to each other and survive slicing or concatenating even-sized chunks
+def draw_normals(rng, shape, antithetic=False, axis=0, dtype=np.float64):
+    if not antithetic:
+        return standard_normal(rng, shape, dtype)
+
+    shape = list(shape)
+    n = shape[axis]
+    shape[axis] = (n + 1) // 2
+    z = standard_normal(rng, shape, dtype)
+
+    shape[axis] = 2 * shape[axis]
+    out = np.empty(shape, dtype)
+    index = [slice(None)] * len(shape)
+    index[axis] = slice(0, None, 2)
+    out[tuple(index)] = z
+    index[axis] = slice(1, None, 2)
+    np.negative(z, out=out[tuple(index)])
+    return out
+
+
+#antithetic pairs are averaged first, they are the independent samples
+def _samples(values, antithetic):
+    values = np.asarray(values, dtype=float)
+    return values.reshape(-1, 2).mean(axis=1) if antithetic else values
+
+
+def mean_with_se(values, antithetic=False):
+    x = _samples(values, antithetic)
+    return float(np.mean(x)), float(np.std(x, ddof=1) / np.sqrt(x.size))
+
+
+#control variate: y is corrected by how far x (with known mean x_mean) landed from its expectation
+def control_variate_mean(y, x, x_mean, antithetic=False):
+    y = _samples(y, antithetic)
+    x = _samples(x, antithetic)
+
+    x_centered = x - np.mean(x)
+    var_x = np.dot(x_centered, x_centered)
+    beta = np.dot(y - np.mean(y), x_centered) / var_x if var_x > 0 else 0.0
+
+    adjusted = y - beta * (x - x_mean)
+    return float(np.mean(adjusted)), float(np.std(adjusted, ddof=1) / np.sqrt(adjusted.size))
+
+
+#batch means: the quantile of each contiguous batch (pairs stay together) and their spread
+def quantile_with_se(values, q, antithetic=False, n_batches=N_BATCHES):
+    values = np.asarray(values, dtype=float)
+    estimate = float(np.quantile(values, q))
+
+    unit = 2 if antithetic else 1
+    n_batches = min(n_batches, values.size // unit)
+    if n_batches < 2:
+        return estimate, float("nan")
+
+    batch_len = values.size // unit // n_batches * unit
+    batches = values[:batch_len * n_batches].reshape(n_batches, batch_len)
+    batch_quantiles = np.quantile(batches, q, axis=1)
+    return estimate, float(np.std(batch_quantiles, ddof=1) / np.sqrt(n_batches))
+
+
+#mean of the values at or below var (the q tail), the standard error comes from the tail samples:
+#CVaR = VaR + E[(X - VaR) 1{X <= VaR}] / q, so its variance is that of (X - VaR) 1{X <= VaR} / q
+def tail_mean_with_se(values, var, q, antithetic=False):
+    values = np.asarray(values, dtype=float)
+    in_tail = values <= var
+    shortfall = _samples(np.where(in_tail, values - var, 0.0), antithetic) / q
+    return float(np.mean(values[in_tail])), float(np.std(shortfall, ddof=1) / np.sqrt(shortfall.size))
+
+
+#mean price, probability of profit, 5% VaR and 5% CVaR (mean ending price in the VaR tail)
+#of the ending prices, each with its standard error
+#expected_price is the analytic E[S_T] of the model, when given it is used as a control variate for the
+#probability of profit only. S_T would be its own control (beta = 1, SE 0), so the mean stays the plain
+#simulated mean and the analytic value is reported next to it as mean_price_analytic.
+#VaR and CVaR are not corrected
+def summarize_terminal(ending_prices, s0, expected_price=None, antithetic=False):
+    ending_prices = np.asarray(ending_prices, dtype=float)
+    profit = (ending_prices > s0).astype(float)
+
+    mean_price, mean_price_se = mean_with_se(ending_prices, antithetic)
+    if expected_price is None:
+        prob_profit, prob_profit_se = mean_with_se(profit, antithetic)
+    else:
+        prob_profit, prob_profit_se = control_variate_mean(profit, ending_prices, expected_price, antithetic)
+
+    var_5, var_5_se = quantile_with_se(ending_prices, 0.05, antithetic)
+    cvar_5, cvar_5_se = tail_mean_with_se(ending_prices, var_5, 0.05, antithetic)
+
+    stats = {
+        "mean_price": mean_price,
+        "mean_price_se": mean_price_se,
+        "prob_profit": prob_profit * 100,
+        "prob_profit_se": prob_profit_se * 100,
+        "var_5": var_5,
+        "var_5_se": var_5_se,
+        "cvar_5": cvar_5,
+        "cvar_5_se": cvar_5_se,
+    }
+    if expected_price is not None:
+        stats["mean_price_analytic"] = float(expected_price)
+    return stats